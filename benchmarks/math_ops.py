@@ -0,0 +1,82 @@
+import timeit
+import random
+from src.linear_algebra import Vector
+from src.plane import Plane
+from src.circle import Circle
+from src.polygon import Polygon, random_convex
+from src.scene import Scene
+
+# run from the repository root with: python -m benchmarks.math_ops
+
+setup = """
+from src.linear_algebra import Vector
+a = Vector(1.5, -2.0)
+b = Vector(0.25, 3.0)
+"""
+
+cases = [
+    ("a + b * 2.0", "a + b * 2.0"),
+    ("a.add_scaled(b, 2.0)", "a.add_scaled(b, 2.0)"),
+    ("a * b", "a * b"),
+    ("a.dot(b)", "a.dot(b)"),
+    ("a ^ b", "a ^ b"),
+    ("a.cross(b)", "a.cross(b)"),
+]
+
+def build_scene(num_bodies=200, seed=0):
+    random.seed(seed)
+
+    bodies = [Plane(Vector(0,0), Vector(0,1)), Plane(Vector(-30,0), Vector(1,0)), Plane(Vector(30,0), Vector(-1,0))]
+
+    for i in range(num_bodies):
+        pos = Vector(random.uniform(-25,25), random.uniform(2,80))
+
+        if i % 2:
+            bodies.append(Circle(pos, random.uniform(0.5,1.5)))
+        else:
+            bodies.append(Polygon(pos, random_convex(random.randint(3,8), random.uniform(0.5,2))))
+
+    return Scene(bodies=bodies)
+
+def step_time(scene : Scene, num_steps : int, delta_time : float):
+    t = timeit.default_timer()
+
+    for _ in range(num_steps):
+        scene.update(delta_time)
+
+    return (timeit.default_timer() - t) / num_steps
+
+# count Vector constructions by wrapping __init__ for the duration of the run,
+# the timing above is measured separately so the wrapper does not skew it
+
+def step_allocations(scene : Scene, num_steps : int, delta_time : float):
+    init = Vector.__init__
+    count = 0
+
+    def counting_init(self, x, y):
+        nonlocal count
+        count += 1
+        init(self, x, y)
+
+    Vector.__init__ = counting_init
+
+    try:
+        for _ in range(num_steps):
+            scene.update(delta_time)
+    finally:
+        Vector.__init__ = init
+
+    return count / num_steps
+
+if __name__ == "__main__":
+    for name, code in cases:
+        print(f"{name:24} {timeit.timeit(code, setup, number=1000000):.3f}s per 1M")
+
+    delta_time = 1/60
+    scene = build_scene()
+
+    for _ in range(100):
+        scene.update(delta_time)
+
+    print(f"Scene.update {step_time(scene, 200, delta_time)*1000:.3f}ms per step")
+    print(f"Scene.update {step_allocations(scene, 50, delta_time):.0f} Vectors per step")
@@ -0,0 +1,121 @@
+import timeit
+import random
+from src.linear_algebra import Vector
+from src.plane import Plane
+from src.scene import Scene
+from src.polygon import Polygon
+from src.circle import Circle
+from src.profiling import average
+
+# polygon-circle narrowphase on the shapes Scene.interact spawns.
+# run from the repository root with: python -m benchmarks.narrowphase
+
+def build_pairs(num_pairs=20000, seed=0):
+    random.seed(seed)
+    pairs = []
+
+    # circles are placed around each polygon so their AABBs overlap, which is
+    # what the broadphase hands to the narrowphase
+    while len(pairs) < num_pairs:
+        scene = Scene(bodies=[])
+        scene.interact(True, Vector(0,0))
+        scene.interact(True, Vector(random.uniform(-6,6), random.uniform(-6,6)))
+
+        if len(scene.bodies) < 2:
+            continue
+
+        A, B = scene.bodies
+
+        if A.kind == B.kind or not A.AABB.collide(B.AABB):
+            continue
+
+        if isinstance(A, Circle):
+            A, B = B, A
+
+        A.ang = random.uniform(-3,3)
+        A.bound()
+        pairs.append((A, B))
+
+    return pairs
+
+def pair_time(pairs : list[tuple[Polygon, Circle]], repeat=5):
+    def run():
+        for A, B in pairs:
+            A.collide(B)
+
+    return min(timeit.repeat(run, number=1, repeat=repeat)) / len(pairs)
+
+# a pile built by clicking: every interact spawns a random polygon or circle
+def build_scene(num_bodies=300, seed=0):
+    random.seed(seed)
+
+    scene = Scene(bodies=[Plane(Vector(0,0), Vector(0,1)), Plane(Vector(-40,0), Vector(1,0)), Plane(Vector(40,0), Vector(-1,0))])
+
+    while len(scene.bodies) < num_bodies + 3:
+        scene.interact(True, Vector(random.uniform(-35,35), random.uniform(5,150)))
+
+    return scene
+
+# a pile of circles only, the granular case collide_circles batches
+def build_circle_pile(num_bodies=2000, seed=0):
+    random.seed(seed)
+
+    scene = Scene(bodies=[Plane(Vector(0,0), Vector(0,1)), Plane(Vector(-20,0), Vector(1,0)), Plane(Vector(20,0), Vector(-1,0))])
+
+    for _ in range(num_bodies):
+        scene.bodies.append(Circle(Vector(random.uniform(-19,19), random.uniform(1,60)), random.uniform(0.3,0.7)))
+
+    return scene
+
+def update_time(scene : Scene, num_steps : int, delta_time : float):
+    scene.enable_profiling(num_steps)
+
+    for _ in range(num_steps):
+        scene.update(delta_time)
+
+    stats = average(scene.stats)
+    scene.disable_profiling()
+
+    return sum(stats.times.values()), stats.times["narrowphase"], stats.num_pairs
+
+def narrowphase_time(scene : Scene, num_steps : int, delta_time : float):
+    scene.enable_profiling(num_steps)
+
+    for _ in range(num_steps):
+        scene.update(delta_time)
+
+    stats = average(scene.stats)
+    scene.disable_profiling()
+
+    return stats.times["narrowphase"], stats.num_hits
+
+if __name__ == "__main__":
+    pairs = build_pairs()
+    hits = sum(1 for A, B in pairs if A.collide(B) is not None)
+
+    print(f"Polygon.collide(Circle) {pair_time(pairs)*1e6:.2f}us per pair, {hits/len(pairs):.0%} hit")
+
+    delta_time = 1/60
+    scene = build_scene()
+
+    for _ in range(200):
+        scene.update(delta_time)
+
+    time, num_hits = narrowphase_time(scene, 200, delta_time)
+    print(f"narrowphase {time*1000:.3f}ms per step, {num_hits:.0f} hits")
+
+    # the same circle pile with and without the numpy batch, once it has
+    # settled into contact
+    for num_bodies in (1000, 2000):
+        for batch in (True, False):
+            scene = build_circle_pile(num_bodies)
+            scene.allow_sleep = False
+
+            if not batch:
+                scene.min_circle_batch = float("inf")
+
+            for _ in range(400):
+                scene.update(delta_time)
+
+            update, narrowphase, num_pairs = update_time(scene, 100, delta_time)
+            print(f"{num_bodies} circles, {'batched' if batch else 'per pair'}: update {update*1000:.2f}ms, narrowphase {narrowphase*1000:.2f}ms, {num_pairs:.0f} pairs")
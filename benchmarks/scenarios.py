@@ -0,0 +1,166 @@
+import argparse
+import json
+import platform
+import random
+import sys
+from time import perf_counter
+from src.linear_algebra import Vector
+from src.plane import Plane
+from src.circle import Circle
+from src.polygon import Polygon, random_convex
+from src.scene import Scene
+from src.profiling import average
+
+# headless scenario benchmarks, no pygame needed. run from the repository root:
+#   python -m benchmarks.scenarios --frames 200 --out results.json
+#   python -m benchmarks.scenarios pyramid circle_rain
+
+def box(w : float, h : float):
+    return [Vector(-w,-h), Vector(w,-h), Vector(w,h), Vector(-w,h)]
+
+def walls(half_width : float):
+    return [Plane(Vector(0,0), Vector(0,1)), Plane(Vector(-half_width,0), Vector(1,0)), Plane(Vector(half_width,0), Vector(-1,0))]
+
+def pyramid(rows=20):
+    bodies = walls(rows + 5)
+
+    for row in range(rows):
+        y = 0.5 + row * 1.0
+
+        for i in range(rows - row):
+            x = (i - (rows - row - 1) / 2) * 1.05
+            bodies.append(Polygon(Vector(x, y), box(0.5, 0.5)))
+
+    return bodies
+
+def circle_rain(num_bodies=500):
+    columns = int(num_bodies ** 0.5)
+    bodies = walls(columns + 5)
+
+    for i in range(num_bodies):
+        x = (i % columns - columns / 2) * 2.2 + random.uniform(-0.1, 0.1)
+        y = 5 + (i // columns) * 2.2
+        bodies.append(Circle(Vector(x, y), random.uniform(0.4, 1), vel=Vector(0, -10)))
+
+    return bodies
+
+def mixed_pile(num_bodies=1000):
+    columns = int(num_bodies ** 0.5)
+    bodies = walls(columns * 1.5 + 5)
+
+    for i in range(num_bodies):
+        pos = Vector((i % columns - columns / 2) * 3, 3 + (i // columns) * 3)
+
+        if i % 2:
+            bodies.append(Circle(pos, random.uniform(0.5, 1.2)))
+        else:
+            bodies.append(Polygon(pos, random_convex(random.randint(3, 8), random.uniform(0.6, 1.4))))
+
+    return bodies
+
+def polygon_avalanche(num_bodies=400):
+    columns = int(num_bodies ** 0.5)
+    bodies = [Plane(Vector(0,0), Vector(0.4,1)), Plane(Vector(-columns * 3 - 20,0), Vector(1,0))]
+
+    for i in range(num_bodies):
+        x = (i % columns) * 2.5
+        y = 5 + (i // columns) * 2.5 - x * 0.4
+        bodies.append(Polygon(Vector(x, y), random_convex(random.randint(3, 8), random.uniform(0.5, 1.2))))
+
+    return bodies
+
+SCENARIOS = {
+    "pyramid": lambda: pyramid(20),
+    "circle_rain": lambda: circle_rain(500),
+    "mixed_pile_1k": lambda: mixed_pile(1000),
+    "mixed_pile_5k": lambda: mixed_pile(5000),
+    "mixed_pile_10k": lambda: mixed_pile(10000),
+    "polygon_avalanche": lambda: polygon_avalanche(400),
+}
+
+# the fraction of dynamic bodies that are touching something or asleep
+
+def settled(scene : Scene):
+    touching = set()
+
+    for collision in scene.collisions:
+        touching.add(collision.A)
+        touching.add(collision.B)
+
+    return sum(1 for body in scene.dynamic if body.sleeping or body in touching) / max(len(scene.dynamic), 1)
+
+# the scenes start in free fall, where solving costs nothing. timing starts
+# once most bodies have landed, after at least warmup steps
+
+def run(name : str, frames : int, warmup : int, delta_time : float, seed : int, contact : float = 0.9, max_warmup : int = 3000):
+    random.seed(seed)
+    scene = Scene(bodies=SCENARIOS[name]())
+    num_warmup = 0
+
+    while num_warmup < warmup or (num_warmup < max_warmup and settled(scene) < contact):
+        scene.update(delta_time)
+        num_warmup += 1
+
+    scene.enable_profiling(frames)
+    start = perf_counter()
+
+    for _ in range(frames):
+        scene.update(delta_time)
+
+    total = perf_counter() - start
+    stats = average(scene.stats)
+    scene.disable_profiling()
+
+    return {
+        "scenario": name,
+        "bodies": len(scene.bodies),
+        "warmup": num_warmup,
+        "settled": settled(scene),
+        "frames": frames,
+        "seconds": total,
+        "steps_per_second": frames / total,
+        "ms_per_step": {phase: 1000 * t for phase, t in stats.times.items()},
+        "pairs_per_step": stats.num_pairs,
+        "collisions_per_step": stats.num_hits,
+        "contacts_per_step": stats.num_contacts,
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="headless Impulse-2D scenario benchmarks")
+    parser.add_argument("scenarios", nargs="*", help=f"any of {', '.join(SCENARIOS)}, all by default")
+    parser.add_argument("--frames", type=int, default=100)
+    parser.add_argument("--warmup", type=int, default=10, help="steps before timing, more until the bodies have landed")
+    parser.add_argument("--contact", type=float, default=0.9, help="fraction of bodies touching something or asleep that counts as landed")
+    parser.add_argument("--max-warmup", type=int, default=3000)
+    parser.add_argument("--dt", type=float, default=1/60)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    for name in args.scenarios:
+        if name not in SCENARIOS:
+            parser.error(f"unknown scenario {name}")
+
+    results = []
+
+    for name in args.scenarios or SCENARIOS:
+        result = run(name, args.frames, args.warmup, args.dt, args.seed, args.contact, args.max_warmup)
+        results.append(result)
+        print(f"{name}: {result['steps_per_second']:.2f} steps/s after {result['warmup']} warmup steps", file=sys.stderr)
+
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "frames": args.frames,
+        "dt": args.dt,
+        "results": results,
+    }
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -5,15 +5,19 @@ import sys
 from math import sin,cos,pi
 from src.linear_algebra import Vector
 from src.body import *
-from src.collision import Collision
 from src.plane import Plane
 from src.circle import Circle
 from src.polygon import Polygon
 from src.scene import Scene
 from src.camera import Camera
+from src.stepper import Stepper
+from src.pipeline import Pipeline
+from src.regions import Regions
+from src.profiling import PHASES, StepStats, average
+from time import perf_counter
 
 pygame.font.init()
-font = pygame.font.SysFont("Verdana",30)
+font = pygame.font.SysFont("Verdana",16)
 
 bodies : list[Body] = [
     Plane(Vector(0,0),Vector(0,1)),
@@ -24,7 +28,7 @@ bodies : list[Body] = [
 ]
 
 class Display:
-    def __init__(self,width=1280,height=650,bg=(0,0,0),fps=120):
+    def __init__(self,width=1280,height=650,bg=(0,0,0),fps=120,pipelined=False,lod=False):
         self.width = width
         self.height = height
         self.hwidth = width//2
@@ -36,11 +40,48 @@ class Display:
         self.corners = [Vector(0,0), Vector(width,0), Vector(width,height), Vector(0,height)]
         self.clock = pygame.time.Clock()
 
-        self.scene = Scene(bodies=bodies)
+        # with lod only bodies around the camera step at full rate, see regions.py
+        self.scene = Scene(bodies=bodies, regions=Regions() if lod else None)
+        self.stepper = Stepper(self.scene, rate=60)
         self.camera = Camera(width=self.width, height=self.height)
 
+        # physics on its own thread, drawing from the frames it publishes
+        self.pipeline = Pipeline(self.stepper) if pipelined else None
+
+        if self.pipeline is not None:
+            self.pipeline.start()
+
         self.debug = False
-        self.debug_collisions : list[Collision] = []
+        self.debug_contacts : list[tuple[float, float, float, float]] = []
+
+    # runs fn against the scene, on the physics thread when pipelined
+
+    def run(self, fn, *args):
+        if self.pipeline is None:
+            fn(*args)
+        else:
+            self.pipeline.post(fn, *args)
+
+    def toggle_debug(self, debug : bool):
+        if debug:
+            self.scene.enable_profiling()
+        else:
+            self.scene.disable_profiling()
+
+    def toggle_pause(self):
+        self.scene.paused = not self.scene.paused
+
+    def step(self):
+        self.scene.paused = False
+        self.stepper.step()
+        self.scene.paused = True
+
+    def quit(self):
+        if self.pipeline is not None:
+            self.pipeline.stop()
+
+        pygame.quit()
+        sys.exit()
 
     def update(self):
         delta_time = self.clock.tick_busy_loop(self.fps) / 1000
@@ -49,20 +90,18 @@ class Display:
         step = False
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
-                pygame.quit()
-                sys.exit()
+                self.quit()
             elif event.type == pygame.MOUSEWHEEL:
                 scroll = event.precise_y
             elif event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_ESCAPE:
-                    pygame.quit()
-                    sys.exit()
+                    self.quit()
                 elif event.key == pygame.K_BACKQUOTE:
                     self.debug = not self.debug
+                    self.run(self.toggle_debug, self.debug)
                 elif event.key == pygame.K_SPACE:
-                    self.scene.paused = not self.scene.paused
+                    self.run(self.toggle_pause)
                 elif event.key == pygame.K_RETURN:
-                    self.scene.paused = False
                     step = True
 
         keys = pygame.key.get_pressed()
@@ -74,11 +113,23 @@ class Display:
 
         self.camera.update(mouse_pos,world_pos,key,shift,scroll,delta_time)
 
+        if self.scene.regions is not None:
+            self.run(self.scene.regions.set_focus, [self.camera.pos])
+
+        if self.pipeline is not None:
+            self.pipeline.interact(left_click, world_pos)
+
+            if step:
+                self.pipeline.post(self.step)
+
+            return
+
         self.scene.interact(left_click, world_pos)
-        self.debug_collisions = self.scene.update(1/self.fps) or self.debug_collisions # fixed delta time
 
         if step:
-            self.scene.paused = True
+            self.step()
+        else:
+            self.stepper.advance(delta_time)
 
     def draw_point(self, colour, pos : Vector):
         pygame.draw.aacircle(self.screen, colour, (pos.x, pos.y), 0.1 * self.camera.zoom)
@@ -126,47 +177,88 @@ class Display:
         pygame.draw.aaline(self.screen, colour, center, (pos.x + rad * cos(ang + pi/30), pos.y - rad * sin(ang + pi/30)))
         pygame.draw.aaline(self.screen, colour, center, (pos.x + rad * cos(ang - pi/30), pos.y - rad * sin(ang - pi/30)))
 
-    def draw_polygon(self, colour, points : list[Vector]):
-        tuples = [(p.x, p.y) for p in points]
-        pygame.gfxdraw.aapolygon(self.screen, tuples, colour)
+    def draw_polygon(self, colour, points : list[tuple[float, float]]):
+        pygame.gfxdraw.aapolygon(self.screen, points, colour)
+
+    def draw_stats(self, colour, stats : StepStats):
+        lines = [f"{phase} {stats.times[phase]*1000:.2f}ms" for phase in PHASES]
+        lines.append(f"total {stats.total()*1000:.2f}ms")
+        lines.append(f"pairs {stats.num_pairs:.0f} rejected {stats.aabb_rejections:.0f}")
+        lines.append(f"hits {stats.num_hits:.0f} contacts {stats.num_contacts:.0f}")
+        lines.append(f"iterations {stats.iterations:.0f}")
+
+        y = 10
+        for line in lines:
+            text = font.render(line, True, colour)
+            self.screen.blit(text, (10, y))
+            y += text.get_height()
 
     def draw(self):
         self.screen.fill(self.bg)
 
-        for body in self.scene.bodies:
+        # only bodies overlapping the viewport get drawn, planes always do.
+        # pipelined, everything comes from the latest frame and the scene is
+        # left to the physics thread
+        viewport = self.camera.viewport()
+
+        if self.pipeline is None:
+            visible = []
+
+            for body in self.scene.query_aabb(viewport):
+                pos, ang = self.stepper.state(body)
+                visible.append((body, pos, ang, body.sleeping, body.AABB))
+
+            contacts = [(p.x, p.y, norm.x, norm.y) for _, p, norm, _ in self.scene.contacts()]
+            stats = average(self.scene.stats)
+        else:
+            frame = self.pipeline.latest()
+            visible = frame.visible(viewport, frame.blend(perf_counter()))
+            contacts = frame.contacts
+            stats = frame.stats or StepStats()
+
+        self.debug_contacts = contacts or self.debug_contacts
+
+        for body, pos, ang, sleeping, box in visible:
+            colour = (128,128,128) if sleeping else (255,255,255)
+
             if body.kind == PLANE:
                 rel_pos = self.camera.to_screen_space(body.pos)
 
-                self.draw_plane((255,255,255), rel_pos, body.norm)
+                self.draw_plane(colour, rel_pos, body.norm)
 
             elif body.kind == CIRCLE:
-                rel_pos = self.camera.to_screen_space(body.pos)
+                rel_pos = self.camera.to_screen_space(pos)
                 rel_rad = body.rad * self.camera.zoom
 
-                self.draw_circle((255,255,255), rel_pos, rel_rad, body.ang)
+                self.draw_circle(colour, rel_pos, rel_rad, ang)
 
             elif body.kind == POLYGON:
-                rel_points = [self.camera.to_screen_space(point) for point in body.transformed_points]
-                self.draw_polygon((255,255,255), rel_points)
+                self.draw_polygon(colour, self.camera.to_screen_points(body.points, pos, ang))
 
             if self.debug:
-                p1 = self.camera.to_screen_space(Vector(body.AABB.x1,body.AABB.y1))
-                p2 = self.camera.to_screen_space(Vector(body.AABB.x2,body.AABB.y2))
+                p1 = self.camera.to_screen_space(Vector(box.x1,box.y1))
+                p2 = self.camera.to_screen_space(Vector(box.x2,box.y2))
                 self.draw_AABB((0,255,0),p1,p2)
 
         if self.debug:
-            for collision in self.debug_collisions:
-                for p in collision.contacts:
-                    rel_pos = self.camera.to_screen_space(p)
-                    p1 = self.camera.to_screen_space(p + collision.norm * .5)
-                    p2 = self.camera.to_screen_space(p - collision.norm * .5)
-
-                    self.draw_point((255,0,0),rel_pos)
-                    self.draw_line((255,0,0), p1, p2)
+            for x, y, nx, ny in self.debug_contacts:
+                p = Vector(x, y)
+                norm = Vector(nx, ny)
+
+                rel_pos = self.camera.to_screen_space(p)
+                p1 = self.camera.to_screen_space(p + norm * .5)
+                p2 = self.camera.to_screen_space(p - norm * .5)
+
+                self.draw_point((255,0,0),rel_pos)
+                self.draw_line((255,0,0), p1, p2)
+
+            self.draw_stats((0,255,0), stats)
         
         pygame.display.flip()
         
-display = Display()
+# python simulation.py --pipeline runs physics on a separate thread,
+# --lod steps bodies far from the camera less often
+display = Display(pipelined="--pipeline" in sys.argv, lod="--lod" in sys.argv)
 
 while 1:
     display.update()
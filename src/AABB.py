@@ -17,4 +17,52 @@ class AABB:
         self.y2 = y2
 
     def collide(self, other : Self):
-        return self.x1 < other.x2 and self.x2 > other.x1 and self.y1 < other.y2 and self.y2 > other.y1
\ No newline at end of file
+        return self.x1 < other.x2 and self.x2 > other.x1 and self.y1 < other.y2 and self.y2 > other.y1
+
+    def contains(self, other : Self):
+        return self.x1 <= other.x1 and self.y1 <= other.y1 and self.x2 >= other.x2 and self.y2 >= other.y2
+
+    def union(self, other : Self):
+        return AABB(min(self.x1, other.x1), min(self.y1, other.y1), max(self.x2, other.x2), max(self.y2, other.y2))
+
+    def perimeter(self):
+        return 2 * (self.x2 - self.x1 + self.y2 - self.y1)
+
+    def bounded(self):
+        return self.x1 != -INF and self.y1 != -INF and self.x2 != INF and self.y2 != INF
+
+    # distance along a normalized ray to where it enters the box, 0 if it
+    # starts inside, None if it misses within max_dist
+
+    def raycast(self, origin : Vector, direction : Vector, max_dist : float = INF):
+        t_min = 0
+        t_max = max_dist
+
+        if direction.x == 0:
+            if origin.x < self.x1 or origin.x > self.x2:
+                return None
+        else:
+            t1 = (self.x1 - origin.x) / direction.x
+            t2 = (self.x2 - origin.x) / direction.x
+            if t1 > t2:
+                t1, t2 = t2, t1
+
+            t_min = max(t_min, t1)
+            t_max = min(t_max, t2)
+
+        if direction.y == 0:
+            if origin.y < self.y1 or origin.y > self.y2:
+                return None
+        else:
+            t1 = (self.y1 - origin.y) / direction.y
+            t2 = (self.y2 - origin.y) / direction.y
+            if t1 > t2:
+                t1, t2 = t2, t1
+
+            t_min = max(t_min, t1)
+            t_max = min(t_max, t2)
+
+        if t_min > t_max:
+            return None
+
+        return t_min
@@ -0,0 +1,132 @@
+from .scene import Scene
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+from array import array
+from itertools import product
+import os
+
+# runs many independent scenes over a process pool. factory(**params) builds
+# each scene and must be picklable (a module level function). workers write
+# their metrics straight into one shared memory block, so only the factory,
+# the parameter dicts and chunk bounds cross process boundaries, never bodies.
+#
+# each run gets a row of doubles: total contacts over the run, settle time
+# (simulated seconds until every dynamic body was asleep, inf if it never
+# happened), number of bodies recorded, then STATE_FIELDS doubles per body
+# for the final state
+
+STATE_FIELDS = ("x", "y", "ang", "vel_x", "vel_y", "ang_vel")
+NUM_STATE_FIELDS = len(STATE_FIELDS)
+HEADER_FIELDS = 3
+
+class BatchResult:
+    def __init__(self, params : list[dict], num_bodies : int, data : array):
+        self.params = params
+        self.num_bodies = num_bodies
+        self.row_size = HEADER_FIELDS + num_bodies * NUM_STATE_FIELDS
+        self.data = data
+
+    def __len__(self):
+        return len(self.params)
+
+    def contacts(self, i : int):
+        return int(self.data[i * self.row_size])
+
+    def settle_time(self, i : int):
+        return self.data[i * self.row_size + 1]
+
+    # final (x, y, ang, vel_x, vel_y, ang_vel) of each recorded body
+
+    def final_state(self, i : int):
+        start = i * self.row_size + HEADER_FIELDS
+        num_bodies = int(self.data[i * self.row_size + 2])
+
+        return [tuple(self.data[start + j * NUM_STATE_FIELDS:start + (j+1) * NUM_STATE_FIELDS]) for j in range(num_bodies)]
+
+    def as_numpy(self):
+        import numpy as np
+
+        rows = np.frombuffer(self.data, dtype=np.float64).reshape(len(self.params), self.row_size)
+        return rows[:,0], rows[:,1], rows[:,HEADER_FIELDS:].reshape(len(self.params), self.num_bodies, NUM_STATE_FIELDS)
+
+# every combination of the given values, e.g. grid(e=[0.2, 0.5], mu_s=[0.3, 0.6])
+
+def grid(**axes):
+    names = list(axes)
+    return [dict(zip(names, values)) for values in product(*axes.values())]
+
+def simulate(scene : Scene, steps : int, delta_time : float):
+    contacts = 0
+    settle_time = float("inf")
+
+    for i in range(steps):
+        scene.update(delta_time)
+
+        for collision in scene.collisions:
+            contacts += len(collision.contacts)
+
+        if settle_time == float("inf") and all(body.sleeping for body in scene.dynamic):
+            settle_time = (i + 1) * delta_time
+
+    return contacts, settle_time
+
+def run_chunk(shm_name : str, row_size : int, num_bodies : int, factory, params : list[dict], start : int, steps : int, delta_time : float):
+    shm = SharedMemory(name=shm_name)
+    data = shm.buf.cast("d")
+
+    try:
+        for k, p in enumerate(params):
+            scene = factory(**p)
+            contacts, settle_time = simulate(scene, steps, delta_time)
+
+            bodies = scene.bodies[:num_bodies]
+            row = (start + k) * row_size
+
+            data[row] = contacts
+            data[row + 1] = settle_time
+            data[row + 2] = len(bodies)
+
+            i = row + HEADER_FIELDS
+            for body in bodies:
+                data[i:i + NUM_STATE_FIELDS] = array("d", (body.pos.x, body.pos.y, body.ang, body.vel.x, body.vel.y, body.ang_vel))
+                i += NUM_STATE_FIELDS
+    finally:
+        data.release()
+        shm.close()
+
+# runs factory(**p) for every p in params for the given number of steps.
+# the number of bodies recorded per run is taken from the first scene.
+# workers=1 runs everything in this process
+
+def run_batch(factory, params : list[dict], steps : int, delta_time : float = 1/60, workers : int = None, chunksize : int = None):
+    params = list(params)
+    workers = workers or os.cpu_count() or 1
+
+    num_bodies = len(factory(**params[0]).bodies) if params else 0
+    row_size = HEADER_FIELDS + num_bodies * NUM_STATE_FIELDS
+
+    if chunksize is None:
+        chunksize = max(1, len(params) // (4 * workers))
+
+    chunks = [(start, params[start:start + chunksize]) for start in range(0, len(params), chunksize)]
+
+    shm = SharedMemory(create=True, size=max(8, len(params) * row_size * 8))
+
+    try:
+        if workers == 1:
+            for start, chunk in chunks:
+                run_chunk(shm.name, row_size, num_bodies, factory, chunk, start, steps, delta_time)
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = [pool.submit(run_chunk, shm.name, row_size, num_bodies, factory, chunk, start, steps, delta_time) for start, chunk in chunks]
+
+                for future in futures:
+                    future.result()
+
+        data = array("d")
+        data.frombytes(shm.buf[:len(params) * row_size * 8])
+    finally:
+        shm.close()
+        shm.unlink()
+
+    return BatchResult(params, num_bodies, data)
@@ -7,6 +7,10 @@ CIRCLE = 1
 POLYGON = 2
 
 class Body(ABC):
+    # pairs that collide() turned away on their AABBs alone, over all bodies.
+    # Scene.profiled_update reports how many one narrowphase added
+    aabb_rejections = 0
+
     def __init__(self, 
                  kind : int,
                  pos : Vector, 
@@ -20,37 +24,62 @@ class Body(ABC):
                  mu_d : float = 0.4):
         
         self.kind = kind
-        self.pos = pos
+        self.pos = pos.copy() # state is updated in place, so never share it
         self.ang = ang
         self.inv_mass = inv_mass
         self.inv_inertia = inv_inertia
 
-        self.vel = vel
+        self.vel = vel.copy()
         self.ang_vel = ang_vel
 
         self.e = e
         self.mu_s = mu_s
         self.mu_d = mu_d
 
+        self.bullet = False # swept over each step so it cannot tunnel, see ccd.py
+
+        self.sleeping = False
+        self.sleep_time = 0
+        self.island : list[Body] = None
+
         self.AABB : AABB = AABB()
         self.bound()
 
     def vel_at(self, pos : Vector):
-        return self.vel + self.ang_vel * pos.perpendicular()
+        vel = self.vel
+        return Vector(vel.x - pos.y * self.ang_vel, vel.y + pos.x * self.ang_vel)
     
     def apply_impulse(self, impulse : Vector, contact : Vector):
-        self.vel += impulse * self.inv_mass
-        self.ang_vel += (contact ^ impulse) * self.inv_inertia
+        if self.sleeping:
+            self.wake()
+
+        self.vel.add_scaled(impulse, self.inv_mass)
+        self.ang_vel += contact.cross(impulse) * self.inv_inertia
 
     def correct_position(self, push : Vector):
-        self.pos += push * self.inv_mass
+        self.pos.add_scaled(push, self.inv_mass)
+        self.bound() # keep the AABB true for queries made between steps
+
+    def sleep(self, island : list):
+        self.sleeping = True
+        self.island = island
+        self.vel.set(0, 0)
+        self.ang_vel = 0
+
+    def wake(self):
+        island = self.island or [self]
+
+        for body in island:
+            body.sleeping = False
+            body.sleep_time = 0
+            body.island = None
 
     def step(self, delta_time, gravity=Vector(0,-9.8)):
-        if self.inv_mass == 0: 
+        if self.inv_mass == 0 or self.sleeping: 
             return
 
-        self.vel += gravity * delta_time
-        self.pos += self.vel * delta_time
+        self.vel.add_scaled(gravity, delta_time)
+        self.pos.add_scaled(self.vel, delta_time)
         self.ang += self.ang_vel * delta_time
 
         self.bound()
@@ -60,5 +89,16 @@ class Body(ABC):
         pass
 
     @abstractmethod
-    def collide(self, other):
-        pass
\ No newline at end of file
+    def collide(self, other, pool=None):
+        pass
+
+    @abstractmethod
+    def contains(self, point):
+        pass
+
+    # distance and surface normal where a normalized ray first hits the body,
+    # distance 0 if it starts inside, None if it misses within max_dist
+
+    @abstractmethod
+    def raycast(self, origin, direction, max_dist):
+        pass
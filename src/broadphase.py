@@ -0,0 +1,413 @@
+from abc import ABC, abstractmethod
+from .body import Body
+from .linear_algebra import Vector
+from .AABB import AABB, INF
+from .tree import AABBTree, Node
+from math import floor
+from bisect import bisect_left, bisect_right
+from operator import attrgetter, sub
+
+# pairs are returned as (A, B) with A before B in the body list,
+# so A.collide(B) sees the same orientation as a plain i < j loop
+
+class Broadphase(ABC):
+    @abstractmethod
+    def pairs(self, bodies : list[Body]) -> list[tuple[Body, Body]]:
+        pass
+
+    # forget everything synced so far, for when bodies leave the list
+    # or change order
+
+    def reset(self):
+        pass
+
+    # drop one body that left the list, the bodies after it move up by one.
+    # by default everything is synced again
+
+    def remove(self, body : Body):
+        self.reset()
+
+    # candidates for spatial queries, a superset of the bodies whose AABB
+    # overlaps the box or is hit by the ray. these fall back to a linear scan
+
+    def query(self, box : AABB, bodies : list[Body]) -> list[Body]:
+        return [body for body in bodies if body.AABB.collide(box)]
+
+    def query_ray(self, origin : Vector, direction : Vector, max_dist : float, bodies : list[Body]) -> list[Body]:
+        if max_dist != INF:
+            end_x = origin.x + direction.x * max_dist
+            end_y = origin.y + direction.y * max_dist
+            bodies = self.query(AABB(min(origin.x, end_x), min(origin.y, end_y), max(origin.x, end_x), max(origin.y, end_y)), bodies)
+
+        return [body for body in bodies if body.AABB.raycast(origin, direction, max_dist) is not None]
+
+class BruteForce(Broadphase):
+    def pairs(self, bodies : list[Body]):
+        num_bodies = len(bodies)
+        res = []
+
+        for i in range(num_bodies-1):
+            A = bodies[i]
+
+            for j in range(i+1, num_bodies):
+                res.append((A, bodies[j]))
+
+        return res
+
+x1_of = attrgetter("AABB.x1")
+x2_of = attrgetter("AABB.x2")
+
+class SweepAndPrune(Broadphase):
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.order : list[Body] = []
+        self.index : dict[Body, int] = {}
+
+        # for queries: the bodies bounded along x in order with their x1 and the
+        # widest of them, and the unbounded ones, as of the last sort(). steps
+        # move bodies, so the first query after a pairs() call sorts again. as
+        # with DynamicTree, bodies moved by hand after that are only seen where
+        # they were until the next pairs()
+        self.bounded : list[Body] = []
+        self.keys : list[float] = []
+        self.max_width = 0
+        self.unbounded : list[Body] = []
+        self.sorted = False
+
+    def sync(self, bodies : list[Body]):
+        num_known = len(self.index)
+
+        if len(bodies) < num_known:
+            self.reset()
+            num_known = 0
+
+        for i in range(num_known, len(bodies)):
+            body = bodies[i]
+            self.index[body] = i
+            self.order.append(body)
+            self.sorted = False
+
+    def remove(self, body : Body):
+        i = self.index.pop(body)
+        self.order.remove(body)
+        self.sorted = False
+
+        for other, j in self.index.items():
+            if j > i:
+                self.index[other] = j - 1
+
+    def sort(self):
+        order = self.order
+        order.sort(key=x1_of)
+
+        keys = list(map(x1_of, order))
+        max_width = max(map(sub, map(x2_of, order), keys), default=0)
+
+        if max_width == INF:
+            bounded = [body for body in order if body.AABB.x2 - body.AABB.x1 != INF]
+            self.unbounded = [body for body in order if body.AABB.x2 - body.AABB.x1 == INF]
+            keys = list(map(x1_of, bounded))
+            max_width = max(map(sub, map(x2_of, bounded), keys), default=0)
+        else:
+            bounded = order.copy()
+            self.unbounded = []
+
+        self.bounded = bounded
+        self.keys = keys
+        self.max_width = max_width
+        self.sorted = True
+
+    def pairs(self, bodies : list[Body]):
+        self.sync(bodies)
+        self.sorted = False
+
+        index = self.index
+        order = self.order
+        num_bodies = len(order)
+        res = []
+
+        # the order is kept between frames, so this only fixes up bodies that
+        # moved past each other (timsort is linear on nearly sorted input)
+        order.sort(key=x1_of)
+
+        for i in range(num_bodies-1):
+            A = order[i]
+            box_A = A.AABB
+            x2 = box_A.x2
+            y1 = box_A.y1
+            y2 = box_A.y2
+
+            for j in range(i+1, num_bodies):
+                B = order[j]
+                box_B = B.AABB
+
+                if box_B.x1 >= x2:
+                    break
+
+                if box_B.y1 >= y2 or box_B.y2 <= y1:
+                    continue
+
+                if index[A] < index[B]:
+                    res.append((A, B))
+                else:
+                    res.append((B, A))
+
+        return res
+
+    # only bodies whose x1 lies within the widest box of the query's x range
+    # can overlap it, the rest of the order is never looked at
+
+    def query(self, box : AABB, bodies : list[Body]):
+        self.sync(bodies)
+
+        if not self.sorted:
+            self.sort()
+
+        start = bisect_left(self.keys, box.x1 - self.max_width)
+        end = bisect_right(self.keys, box.x2)
+
+        return self.unbounded + [body for body in self.bounded[start:end] if body.AABB.collide(box)]
+
+# uniform grid rebuilt every frame, best when cell_size is close to the
+# diameter of most bodies. unbounded bodies (planes) pair with everything
+
+class SpatialHash(Broadphase):
+    def __init__(self, cell_size : float = 4):
+        self.cell_size = cell_size
+
+        self.reset()
+
+    def reset(self):
+        # grid of the bodies' AABBs as of the last build()
+        self.cells : dict[tuple[int, int], list[int]] = {}
+        self.unbounded : list[int] = []
+        self.num_bodies = 0
+
+        # the solver moves bodies after pairs(), so the first query after it
+        # builds the grid again. as with SweepAndPrune, bodies moved by hand
+        # after that are only seen where they were until the next pairs()
+        self.built = False
+
+    # puts every body in the cells its AABB covers and returns each bounded
+    # body's first cell, None for the unbounded ones
+
+    def build(self, bodies : list[Body]):
+        inv_cell_size = 1 / self.cell_size
+        cells : dict[tuple[int, int], list[int]] = {}
+        ranges = []
+        unbounded = []
+
+        self.cells = cells
+        self.unbounded = unbounded
+        self.num_bodies = len(bodies)
+
+        for i, body in enumerate(bodies):
+            box = body.AABB
+
+            if box.x1 == -INF or box.y1 == -INF or box.x2 == INF or box.y2 == INF:
+                unbounded.append(i)
+                ranges.append(None)
+                continue
+
+            cx1 = floor(box.x1 * inv_cell_size)
+            cy1 = floor(box.y1 * inv_cell_size)
+            cx2 = floor(box.x2 * inv_cell_size)
+            cy2 = floor(box.y2 * inv_cell_size)
+            ranges.append((cx1, cy1))
+
+            for cx in range(cx1, cx2+1):
+                for cy in range(cy1, cy2+1):
+                    cell = cells.get((cx, cy))
+                    if cell is None:
+                        cells[(cx, cy)] = [i]
+                    else:
+                        cell.append(i)
+
+        return ranges
+
+    def pairs(self, bodies : list[Body]):
+        ranges = self.build(bodies)
+        self.built = False
+
+        cells = self.cells
+        unbounded = self.unbounded
+        res = []
+
+        for (cx, cy), cell in cells.items():
+            num_cell = len(cell)
+
+            for a in range(num_cell-1):
+                i = cell[a]
+                box_A = bodies[i].AABB
+                cx1_A, cy1_A = ranges[i]
+
+                for b in range(a+1, num_cell):
+                    j = cell[b]
+                    cx1_B, cy1_B = ranges[j]
+
+                    # only report the pair from the first cell both bodies share
+                    if max(cx1_A, cx1_B) != cx or max(cy1_A, cy1_B) != cy:
+                        continue
+
+                    if box_A.collide(bodies[j].AABB):
+                        res.append((bodies[i], bodies[j]))
+
+        for i in unbounded:
+            A = bodies[i]
+
+            for j in range(len(bodies)):
+                if j == i or (ranges[j] is None and j < i):
+                    continue
+
+                if i < j:
+                    res.append((A, bodies[j]))
+                else:
+                    res.append((bodies[j], A))
+
+        return res
+
+    def query(self, box : AABB, bodies : list[Body]):
+        if not box.bounded():
+            return super().query(box, bodies)
+
+        # bodies added since the last build are not in the grid yet
+        if not self.built or len(bodies) != self.num_bodies:
+            self.build(bodies)
+            self.built = True
+
+        inv_cell_size = 1 / self.cell_size
+        cx1 = floor(box.x1 * inv_cell_size)
+        cy1 = floor(box.y1 * inv_cell_size)
+        cx2 = floor(box.x2 * inv_cell_size)
+        cy2 = floor(box.y2 * inv_cell_size)
+
+        if (cx2 - cx1 + 1) * (cy2 - cy1 + 1) > len(self.cells):
+            return super().query(box, bodies)
+
+        found = set(self.unbounded)
+
+        for cx in range(cx1, cx2+1):
+            for cy in range(cy1, cy2+1):
+                cell = self.cells.get((cx, cy))
+                if cell is not None:
+                    found.update(cell)
+
+        return [bodies[i] for i in sorted(found)]
+
+# bodies are stored in a dynamic AABB tree with bounds fattened by a margin and
+# by their velocity over the lookahead time. a body is only reinserted once its
+# tight AABB leaves its fat one, so pair generation stays close to O(n log n)
+# even when body sizes vary a lot
+
+class DynamicTree(Broadphase):
+    def __init__(self, margin : float = 0.1, lookahead : float = 0.05):
+        self.margin = margin
+        self.lookahead = lookahead
+        self.reset()
+
+    def reset(self):
+        self.tree = AABBTree()
+        self.leaves : dict[Body, Node] = {}
+        self.index : dict[Body, int] = {}
+        self.unbounded : list[Body] = []
+
+        # whether the fat boxes hold the bodies' current AABBs. the solver moves
+        # bodies after pairs(), so the first query after it refits the tree
+        self.fitted = False
+
+    def fatten(self, body : Body):
+        box = body.AABB
+        margin = self.margin
+        dx = body.vel.x * self.lookahead
+        dy = body.vel.y * self.lookahead
+
+        return AABB(box.x1 - margin + min(dx, 0), 
+                    box.y1 - margin + min(dy, 0), 
+                    box.x2 + margin + max(dx, 0), 
+                    box.y2 + margin + max(dy, 0))
+
+    def sync(self, bodies : list[Body]):
+        num_known = len(self.index)
+
+        if len(bodies) < num_known:
+            self.reset()
+            num_known = 0
+
+        for i in range(num_known, len(bodies)):
+            body = bodies[i]
+            self.index[body] = i
+
+            if body.AABB.bounded():
+                self.leaves[body] = self.tree.insert(self.fatten(body), body)
+            else:
+                self.unbounded.append(body)
+
+    def remove(self, body : Body):
+        i = self.index.pop(body)
+        leaf = self.leaves.pop(body, None)
+
+        if leaf is not None:
+            self.tree.remove(leaf)
+        else:
+            self.unbounded.remove(body)
+
+        for other, j in self.index.items():
+            if j > i:
+                self.index[other] = j - 1
+
+    def update(self):
+        tree = self.tree
+
+        for body, leaf in self.leaves.items():
+            if not leaf.AABB.contains(body.AABB):
+                tree.move(leaf, self.fatten(body))
+
+    def pairs(self, bodies : list[Body]):
+        self.sync(bodies)
+        self.update()
+        self.fitted = False
+
+        index = self.index
+        res = []
+
+        for A in self.leaves:
+            box_A = A.AABB
+            i = index[A]
+
+            for B in self.tree.query(box_A):
+                if index[B] > i and box_A.collide(B.AABB):
+                    res.append((A, B))
+
+        for A in self.unbounded:
+            i = index[A]
+
+            for B in bodies:
+                if B is A or (B in self.unbounded and index[B] < i):
+                    continue
+
+                if i < index[B]:
+                    res.append((A, B))
+                else:
+                    res.append((B, A))
+
+        return res
+
+    # as with SweepAndPrune, bodies moved by hand after the first query are
+    # only seen where they were until the next pairs()
+
+    def refit(self, bodies : list[Body]):
+        self.sync(bodies)
+
+        if not self.fitted:
+            self.update()
+            self.fitted = True
+
+    def query(self, box : AABB, bodies : list[Body]):
+        self.refit(bodies)
+        return self.tree.query(box) + self.unbounded
+
+    def query_ray(self, origin : Vector, direction : Vector, max_dist : float, bodies : list[Body]):
+        self.refit(bodies)
+        return self.tree.raycast(origin, direction, max_dist) + self.unbounded
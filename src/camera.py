@@ -1,8 +1,10 @@
 from .linear_algebra import Vector
+from .AABB import AABB
+from math import sin, cos
 
 class Camera:
     def __init__(self, pos : Vector = Vector(0,0), zoom=50, width=1280, height=650):
-        self.pos = pos
+        self.pos = pos.copy()
         self.zoom = zoom
 
         self.vel = Vector(0,0)
@@ -26,7 +28,7 @@ class Camera:
 
         if scroll:
             self.offset = mouse_pos
-            self.pos = world_pos
+            self.pos = world_pos.copy()
             self.zoom_vel += scroll * self.zoom_speed * self.zoom
 
         self.vel *= self.pan_friction
@@ -50,3 +52,23 @@ class Camera:
     def to_world_space(self, pos : Vector):
         pos.y = self.height - pos.y
         return (pos - self.offset) / self.zoom + self.pos
+
+    # local points of a body at pos, ang straight to screen space tuples, without
+    # going through a world space Vector per point
+
+    def to_screen_points(self, points : list[Vector], pos : Vector, ang : float):
+        zoom = self.zoom
+        cos_theta = cos(ang) * zoom
+        sin_theta = sin(ang) * zoom
+        x = (pos.x - self.pos.x) * zoom + self.offset.x
+        y = self.height - (pos.y - self.pos.y) * zoom - self.offset.y
+
+        return [(x + p.x * cos_theta - p.y * sin_theta, y - p.x * sin_theta - p.y * cos_theta) for p in points]
+
+    # the world space box the screen currently shows
+
+    def viewport(self):
+        x1 = self.pos.x - self.offset.x / self.zoom
+        y1 = self.pos.y - self.offset.y / self.zoom
+
+        return AABB(x1, y1, x1 + self.width / self.zoom, y1 + self.height / self.zoom)
@@ -1,7 +1,9 @@
 from .body import *
 from .linear_algebra import Vector
-from .collision import Collision
-from math import pi
+from .collision import Collision, CollisionPool, manifold
+from .shape import circle_shape
+from math import sqrt
+from importlib.util import find_spec
 
 class Circle(Body):
     def __init__(self,
@@ -15,32 +17,125 @@ class Circle(Body):
                  mu_s : float = 0.5,
                  mu_d : float = 0.4):
         
+        self.shape = circle_shape(rad)
         self.rad = rad
-        inv_mass = 1 / self.rad ** 2 * inv_density
-        inv_inertia = 4 / (pi * self.rad ** 4)
+        inv_mass = inv_density / self.shape.area
+        inv_inertia = 1 / self.shape.inertia
 
         super().__init__(CIRCLE, pos, ang, inv_mass, inv_inertia, vel, ang_vel, e, mu_s, mu_d)
 
     def bound(self):
         self.AABB.update(self.pos.x - self.rad, self.pos.y - self.rad, self.pos.x + self.rad, self.pos.y + self.rad)
 
-    def collide(self, other : Body):
+    def contains(self, point : Vector):
+        dx = point.x - self.pos.x
+        dy = point.y - self.pos.y
+        return dx * dx + dy * dy <= self.rad * self.rad
+
+    def raycast(self, origin : Vector, direction : Vector, max_dist : float = float("inf")):
+        mx = origin.x - self.pos.x
+        my = origin.y - self.pos.y
+
+        b = mx * direction.x + my * direction.y
+        c = mx * mx + my * my - self.rad * self.rad
+
+        if c <= 0:
+            return 0, -direction
+
+        disc = b * b - c
+
+        if b > 0 or disc < 0:
+            return None
+
+        t = -b - disc ** 0.5
+
+        if t > max_dist:
+            return None
+
+        norm = Vector(mx + direction.x * t, my + direction.y * t)
+        norm.normalize()
+
+        return t, norm
+
+    def collide(self, other : Body, pool : CollisionPool = None):
         if not self.AABB.collide(other.AABB):
+            Body.aabb_rejections += 1
             return
         
         if other.kind == PLANE:
-            return other.collide(self)
+            return other.collide(self, pool)
         elif other.kind == CIRCLE:
             dpos = other.pos - self.pos
 
             sqr_dist = dpos.squared_length()
-            if sqr_dist < (self.rad + other.rad) ** 2:
-                dist = sqr_dist ** 0.5
+            rad_sum = self.rad + other.rad
+            if sqr_dist < rad_sum * rad_sum:
+                dist = sqrt(sqr_dist)
                 norm = dpos / dist
-                depth = self.rad + other.rad - dist
+                depth = rad_sum - dist
 
                 contact = self.pos + norm * self.rad
 
-                return Collision(self, other, norm, depth, [contact])
+                return manifold(pool, self, other, norm, depth, [contact])
         elif other.kind == POLYGON:
-            return other.collide(self)
\ No newline at end of file
+            return other.collide(self, pool)
+HAVE_NUMPY = find_spec("numpy") is not None
+
+# Circle.collide over many circle pairs in one numpy pass, for the piles
+# where the per pair calls dominate the narrowphase. each body is read once
+# however many pairs it is in, and the float operations are the same as in
+# Circle.collide, so every entry is the manifold it would have returned for
+# that pair, or None
+
+def collide_circles(pairs : list[tuple[Circle, Circle]], pool : CollisionPool = None):
+    import numpy as np
+
+    index = {}
+    first = np.array([index.setdefault(A, len(index)) for A, B in pairs])
+    second = np.array([index.setdefault(B, len(index)) for A, B in pairs])
+
+    state = np.array([(body.AABB.x1, body.AABB.y1, body.AABB.x2, body.AABB.y2, body.pos.x, body.pos.y, body.rad) for body in index])
+    A = state[first]
+    B = state[second]
+
+    overlap = (A[:,0] < B[:,2]) & (A[:,2] > B[:,0]) & (A[:,1] < B[:,3]) & (A[:,3] > B[:,1])
+    Body.aabb_rejections += len(pairs) - int(np.count_nonzero(overlap))
+
+    dx = B[:,4] - A[:,4]
+    dy = B[:,5] - A[:,5]
+    rad_sum = A[:,6] + B[:,6]
+    sqr_dist = dx * dx + dy * dy
+
+    hits = np.flatnonzero(overlap & (sqr_dist < rad_sum * rad_sum))
+    results = [None] * len(pairs)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        dist = np.sqrt(sqr_dist[hits])
+        norm_x = dx[hits] / dist
+        norm_y = dy[hits] / dist
+
+    depth = rad_sum[hits] - dist
+    contact_x = A[hits,4] + norm_x * A[hits,6]
+    contact_y = A[hits,5] + norm_y * A[hits,6]
+
+    # pooled manifolds copy their vectors, so one pair of them does for all hits
+    norm = Vector(0,0)
+    contacts = [Vector(0,0)]
+
+    for i, d, nx, ny, depth_i, cx, cy in zip(hits.tolist(), dist.tolist(), norm_x.tolist(), norm_y.tolist(),
+                                             depth.tolist(), contact_x.tolist(), contact_y.tolist()):
+        A, B = pairs[i]
+
+        # coincident centres have no normal, leave them to Circle.collide
+        if d == 0:
+            results[i] = A.collide(B, pool)
+        elif pool is None:
+            results[i] = Collision(A, B, Vector(nx, ny), depth_i, [Vector(cx, cy)])
+        else:
+            norm.x = nx
+            norm.y = ny
+            contacts[0].x = cx
+            contacts[0].y = cy
+            results[i] = pool.get(A, B, norm, depth_i, contacts)
+
+    return results
@@ -1,50 +1,89 @@
 from .linear_algebra import Vector
 from .body import Body
+from math import copysign
 
 class Collision:
-    def __init__(self, A : Body, B : Body, norm : Vector, depth : float, contacts : list[Vector]):
+    def __init__(self, A : Body, B : Body, norm : Vector, depth : float, contacts : list[Vector], features : list = None):
         self.A = A
         self.B = B
         self.norm = norm
         self.depth = depth
         self.contacts = contacts
 
+        # identifies each contact across frames for warm starting, defaults to its index
+        self.features = features or list(range(len(contacts)))
+
+        # vectors owned by a pooled manifold, contacts is a prefix of it
+        self.points : list[Vector] = []
+
+    # reinitializes a pooled manifold in place. norm and contacts are copied,
+    # so the caller's vectors are never aliased and no new ones are made once
+    # the manifold has held this many contacts before
+
+    def set(self, A : Body, B : Body, norm : Vector, depth : float, contacts : list[Vector], features : list = None):
+        self.A = A
+        self.B = B
+        self.norm.set(norm.x, norm.y)
+        self.depth = depth
+
+        points = self.points
+
+        while len(points) < len(contacts):
+            points.append(Vector(0,0))
+
+        own = self.contacts
+        own.clear()
+
+        for point, contact in zip(points, contacts):
+            point.set(contact.x, contact.y)
+            own.append(point)
+
+        self.features.clear()
+        self.features.extend(features if features else range(len(contacts)))
+
+        return self
+
     def resolve(self, slop=0.00198, percentage=0.25):
         A = self.A
         B = self.B
+        norm = self.norm
 
         inv_num_contacts = 1 / len(self.contacts)
+        impulse = Vector(0,0)
 
         for contact in self.contacts:
             rel_A = contact - A.pos
             rel_B = contact - B.pos
-            rel_vel = B.vel_at(rel_B) - A.vel_at(rel_A)
+            rel_vel = B.vel_at(rel_B)
+            rel_vel -= A.vel_at(rel_A)
 
-            contact_vel = rel_vel * self.norm
+            contact_vel = rel_vel.dot(norm)
 
             if contact_vel > 0:
                 continue
 
             inv_mass_sum = A.inv_mass + B.inv_mass
-            inv_mass_sum += (rel_A ^ self.norm)**2 * A.inv_inertia
-            inv_mass_sum += (rel_B ^ self.norm)**2 * B.inv_inertia
+            inv_mass_sum += rel_A.cross(norm)**2 * A.inv_inertia
+            inv_mass_sum += rel_B.cross(norm)**2 * B.inv_inertia
 
             e = min(A.e, B.e)
             j = -(1 + e) * contact_vel / inv_mass_sum * inv_num_contacts
 
-            impulse = self.norm * j
-            A.apply_impulse(-impulse, rel_A)
-            B.apply_impulse( impulse, rel_B)
+            impulse.set(norm.x * j, norm.y * j)
+            B.apply_impulse(impulse, rel_B)
+            impulse *= -1
+            A.apply_impulse(impulse, rel_A)
 
-            rel_vel = B.vel_at(rel_B) - A.vel_at(rel_A)
-            tang = rel_vel - self.norm * contact_vel
+            rel_vel = B.vel_at(rel_B)
+            rel_vel -= A.vel_at(rel_A)
+            tang = rel_vel.copy().add_scaled(norm, -contact_vel)
 
             if tang.squared_length() == 0: 
                 continue
 
             tang.normalize()
 
-            j_t = -(rel_vel * tang) / inv_mass_sum * inv_num_contacts
+            j_t = -rel_vel.dot(tang) / inv_mass_sum * inv_num_contacts
 
             if j_t == 0:
                 continue
@@ -53,16 +92,162 @@ class Collision:
             mu_d = (A.mu_d + B.mu_d) * 0.5
 
             if abs(j_t) <= j * mu_s:
-                impulse_t = tang * j_t
+                tang *= j_t
             else:
-                impulse_t = tang * -j * mu_d
+                tang *= -j * mu_d
+
+            B.apply_impulse(tang, rel_B)
+            tang *= -1
+            A.apply_impulse(tang, rel_A)
 
-            A.apply_impulse(-impulse_t, rel_A)
-            B.apply_impulse( impulse_t, rel_B)
+        self.correct(slop, percentage)
+
+    def correct(self, slop=0.00198, percentage=0.25):
+        A = self.A
+        B = self.B
 
         if self.depth > slop:
             step = self.depth * percentage
             push = self.norm * step / (A.inv_mass + B.inv_mass)
 
             A.correct_position(-push)
-            B.correct_position( push)
\ No newline at end of file
+            B.correct_position( push)
+
+    # sequential impulse solving, see SequentialImpulseSolver
+
+    def prepare(self, delta_time, restitution_threshold=1, baumgarte=0.2, slop=0.01):
+        A = self.A
+        B = self.B
+        norm = self.norm
+        tang = norm.perpendicular()
+
+        e = min(A.e, B.e)
+        self.mu_s = (A.mu_s + B.mu_s) * 0.5
+        self.mu_d = (A.mu_d + B.mu_d) * 0.5
+
+        self.rel_A = []
+        self.rel_B = []
+        self.normal_mass = []
+        self.tangent_mass = []
+        self.bias = []
+        self.normal_impulses = [0] * len(self.contacts)
+        self.tangent_impulses = [0] * len(self.contacts)
+
+        for contact in self.contacts:
+            rel_A = contact - A.pos
+            rel_B = contact - B.pos
+
+            inv_mass_sum = A.inv_mass + B.inv_mass
+            inv_mass_n = inv_mass_sum + (rel_A ^ norm)**2 * A.inv_inertia + (rel_B ^ norm)**2 * B.inv_inertia
+            inv_mass_t = inv_mass_sum + (rel_A ^ tang)**2 * A.inv_inertia + (rel_B ^ tang)**2 * B.inv_inertia
+
+            # only bounce off fast impacts, resting contacts would jitter otherwise.
+            # penetration is pushed out by a velocity bias instead of moving bodies
+            contact_vel = (B.vel_at(rel_B) - A.vel_at(rel_A)) * norm
+            bounce = -e * contact_vel if contact_vel < -restitution_threshold else 0
+            push = baumgarte / delta_time * max(self.depth - slop, 0)
+
+            self.rel_A.append(rel_A)
+            self.rel_B.append(rel_B)
+            self.normal_mass.append(1 / inv_mass_n)
+            self.tangent_mass.append(1 / inv_mass_t)
+            self.bias.append(max(bounce, push))
+
+    def warm_start(self, normal_impulses : list[float], tangent_impulses : list[float]):
+        A = self.A
+        B = self.B
+        norm = self.norm
+        tang = norm.perpendicular()
+        impulse = Vector(0,0)
+
+        for i in range(len(self.contacts)):
+            j = normal_impulses[i]
+            j_t = tangent_impulses[i]
+
+            self.normal_impulses[i] = j
+            self.tangent_impulses[i] = j_t
+
+            impulse.set(norm.x * j + tang.x * j_t, norm.y * j + tang.y * j_t)
+            B.apply_impulse(impulse, self.rel_B[i])
+            impulse *= -1
+            A.apply_impulse(impulse, self.rel_A[i])
+
+    def solve_velocity(self):
+        A = self.A
+        B = self.B
+        norm = self.norm
+        tang = norm.perpendicular()
+        impulse = Vector(0,0)
+
+        for i in range(len(self.contacts)):
+            rel_A = self.rel_A[i]
+            rel_B = self.rel_B[i]
+
+            # normal impulse, accumulated impulse is kept non-negative
+
+            rel_vel = B.vel_at(rel_B)
+            rel_vel -= A.vel_at(rel_A)
+            contact_vel = rel_vel.dot(norm)
+            j = self.normal_mass[i] * (self.bias[i] - contact_vel)
+
+            old_j = self.normal_impulses[i]
+            new_j = max(old_j + j, 0)
+            self.normal_impulses[i] = new_j
+            j = new_j - old_j
+
+            impulse.set(norm.x * j, norm.y * j)
+            B.apply_impulse(impulse, rel_B)
+            impulse *= -1
+            A.apply_impulse(impulse, rel_A)
+
+            # friction impulse, static until it exceeds mu_s then kinetic
+
+            rel_vel = B.vel_at(rel_B)
+            rel_vel -= A.vel_at(rel_A)
+            tang_vel = rel_vel.dot(tang)
+            j_t = -self.tangent_mass[i] * tang_vel
+
+            old_j_t = self.tangent_impulses[i]
+            new_j_t = old_j_t + j_t
+
+            if abs(new_j_t) > new_j * self.mu_s:
+                new_j_t = copysign(new_j * self.mu_d, new_j_t)
+
+            self.tangent_impulses[i] = new_j_t
+            j_t = new_j_t - old_j_t
+
+            impulse.set(tang.x * j_t, tang.y * j_t)
+            B.apply_impulse(impulse, rel_B)
+            impulse *= -1
+            A.apply_impulse(impulse, rel_A)
+
+# hands out manifolds that are reused from step to step. release() takes back
+# every manifold given out since the last release, so they and their vectors
+# are only valid until then, copy anything that has to outlive the step
+
+class CollisionPool:
+    def __init__(self):
+        self.free : list[Collision] = []
+        self.used : list[Collision] = []
+
+    def get(self, A : Body, B : Body, norm : Vector, depth : float, contacts : list[Vector], features : list = None):
+        if self.free:
+            collision = self.free.pop()
+        else:
+            collision = Collision(A, B, Vector(0,0), 0, [])
+
+        self.used.append(collision)
+        return collision.set(A, B, norm, depth, contacts, features)
+
+    def release(self):
+        self.free += self.used
+        self.used.clear()
+
+# what collide returns on a hit: a pooled manifold when given a pool, otherwise
+# a new Collision the caller can keep
+
+def manifold(pool : CollisionPool, A : Body, B : Body, norm : Vector, depth : float, contacts : list[Vector], features : list = None):
+    if pool is None:
+        return Collision(A, B, norm, depth, contacts, features)
+
+    return pool.get(A, B, norm, depth, contacts, features)
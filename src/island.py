@@ -0,0 +1,53 @@
+from .body import Body
+from .collision import Collision
+
+# groups of dynamic bodies connected by contacts. static bodies do not join
+# islands, so two piles resting on the same plane stay independent
+
+class Island:
+    def __init__(self):
+        self.bodies : list[Body] = []
+        self.collisions : list[Collision] = []
+
+def find(parent : dict[Body, Body], body : Body):
+    root = body
+    while parent[root] is not root:
+        root = parent[root]
+
+    while parent[body] is not root:
+        parent[body], body = root, parent[body]
+
+    return root
+
+def build_islands(bodies : list[Body], collisions : list[Collision]):
+    parent = {body: body for body in bodies}
+
+    for collision in collisions:
+        A = collision.A
+        B = collision.B
+
+        if A in parent and B in parent:
+            root_A = find(parent, A)
+            root_B = find(parent, B)
+
+            if root_A is not root_B:
+                parent[root_B] = root_A
+
+    islands : dict[Body, Island] = {}
+
+    for body in bodies:
+        root = find(parent, body)
+        island = islands.get(root)
+
+        if island is None:
+            island = islands[root] = Island()
+
+        island.bodies.append(body)
+
+    for collision in collisions:
+        body = collision.A if collision.A in parent else collision.B
+
+        if body in parent:
+            islands[find(parent, body)].collisions.append(collision)
+
+    return list(islands.values())
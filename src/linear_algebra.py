@@ -1,6 +1,9 @@
-from math import sin, cos
+# operators allocate a new Vector, the in-place operators and the explicit
+# methods below do not and are what the hot loops use
 
 class Vector:
+    __slots__ = ("x", "y")
+
     def __init__(self, x, y):
         self.x = x
         self.y = y
@@ -10,40 +13,77 @@ class Vector:
 
     def __add__(self, other):
         return Vector(self.x + other.x, self.y + other.y)
-    
+
     def __sub__(self, other):
         return Vector(self.x - other.x, self.y - other.y)
-    
+
     def __mul__(self, other):
-        if isinstance(other, Matrix):
-            return other * self
-        
+        if other.__class__ is float or other.__class__ is int:
+            return Vector(self.x * other, self.y * other)
+
         if isinstance(other, Vector):
             return self.x * other.x + self.y * other.y
-        
+
+        if isinstance(other, Matrix):
+            return other * self
+
         return Vector(self.x * other, self.y * other)
-    
+
     def __rmul__(self, other):
         return self * other
-    
+
     def __truediv__(self, other):
         return Vector(self.x / other, self.y / other)
-    
+
     def __xor__(self, other):
         return self.x * other.y - self.y * other.x
-    
+
+    def __iadd__(self, other):
+        self.x += other.x
+        self.y += other.y
+        return self
+
+    def __isub__(self, other):
+        self.x -= other.x
+        self.y -= other.y
+        return self
+
+    def __imul__(self, other):
+        self.x *= other
+        self.y *= other
+        return self
+
     def __repr__(self):
         return f"Vector({self.x},{self.y})"
-    
+
+    def dot(self, other):
+        return self.x * other.x + self.y * other.y
+
+    def cross(self, other):
+        return self.x * other.y - self.y * other.x
+
+    def add_scaled(self, other, scale):
+        self.x += other.x * scale
+        self.y += other.y * scale
+        return self
+
+    def set(self, x, y):
+        self.x = x
+        self.y = y
+        return self
+
+    def copy(self):
+        return Vector(self.x, self.y)
+
     def perpendicular(self):
         return Vector(-self.y, self.x)
-    
+
     def length(self):
-        return (self.x ** 2 + self.y ** 2) ** 0.5
-    
+        return (self.x * self.x + self.y * self.y) ** 0.5
+
     def squared_length(self):
-        return self.x ** 2 + self.y ** 2
-    
+        return self.x * self.x + self.y * self.y
+
     def normalize(self):
         d = self.length()
         if d == 0:
@@ -59,6 +99,8 @@ class Vector:
         return tmp
 
 class Matrix:
+    __slots__ = ("a", "b", "c", "d")
+
     def __init__(self, a, b, c, d):
         self.a = a
         self.b = b
@@ -67,32 +109,21 @@ class Matrix:
 
     def __add__(self, other):
         return Matrix(self.a + other.a, self.b + other.b, self.c + other.c, self.d + other.d)
-    
+
     def __sub__(self, other):
         return Matrix(self.a - other.a, self.b - other.b, self.c - other.c, self.d - other.d)
-    
+
     def __mul__(self, other):
+        if isinstance(other, Vector):
+            return Vector(other.x * self.a + other.y * self.b, other.x * self.c + other.y * self.d)
+
         if isinstance(other, Matrix):
-            return Matrix(self.a * other.a + self.c * other.b, 
+            return Matrix(self.a * other.a + self.c * other.b,
                           self.b * other.a + self.d * other.b,
                           self.a * other.c + self.c * other.d,
                           self.b * other.c + self.d * other.d)
-        
-        if isinstance(other, Vector):
-            return Vector(other.x * self.a + other.y * self.b, other.x * self.c + other.y * self.d)
-        
+
         return Matrix(self.a * other, self.b * other, self.c * other, self.d * other)
-    
+
     def __truediv__(self, other):
         return Matrix(self.a / other, self.b / other, self.c / other, self.d / other)
-    
-class RotationMatrix(Matrix):
-    def __init__(self, theta, sin_theta=None, cos_theta=None):
-        self.theta = theta
-        self.sin_theta = sin_theta or sin(self.theta)
-        self.cos_theta = cos_theta or cos(self.theta)
-
-        super().__init__(self.cos_theta, -self.sin_theta, self.sin_theta, self.cos_theta)
-
-    def inverse(self):
-        return RotationMatrix(-self.theta, -self.sin_theta, self.cos_theta)
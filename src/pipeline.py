@@ -0,0 +1,146 @@
+from .linear_algebra import Vector
+from .body import *
+from .AABB import AABB
+from .stepper import Stepper
+from .profiling import StepStats, average
+from threading import Thread
+from queue import SimpleQueue, Empty
+from time import perf_counter
+
+# what the renderer needs from one step, copied out of the scene on the
+# physics thread. nothing in a frame is modified after it is built, so the
+# renderer can keep drawing one while the next step is being computed.
+# each body is (body, previous x, y, ang, current x, y, ang, sleeping, AABB),
+# each contact point (x, y, norm x, norm y). bodies are only read for their
+# kind and shape, which never change
+
+class Frame:
+    __slots__ = ("time", "rate", "alpha", "paused", "bodies", "contacts", "stats")
+
+    def __init__(self, stepper : Stepper, time : float):
+        scene = stepper.scene
+        previous = stepper.previous
+
+        self.time = time
+        self.rate = stepper.rate
+        self.alpha = stepper.alpha
+        self.paused = scene.paused
+
+        bodies = []
+
+        for body in scene.bodies:
+            pos = body.pos
+            box = body.AABB
+            x0, y0, ang0 = previous.get(body) or (pos.x, pos.y, body.ang)
+
+            bodies.append((body, x0, y0, ang0, pos.x, pos.y, body.ang, body.sleeping, AABB(box.x1, box.y1, box.x2, box.y2)))
+
+        self.bodies : tuple[tuple, ...] = tuple(bodies)
+        self.contacts : tuple[tuple[float, float, float, float], ...] = tuple((p.x, p.y, norm.x, norm.y) for _, p, norm, _ in scene.contacts())
+        self.stats : StepStats = average(scene.stats) if scene.profiling else None
+
+    # how far to blend from the previous step to the current one at time now,
+    # carrying on from the stepper's alpha as time passes after publishing
+
+    def blend(self, now : float):
+        if self.paused:
+            return 1
+
+        return min(self.alpha + (now - self.time) * self.rate, 1)
+
+    # (body, pos, ang, sleeping, AABB) for every body overlapping box, planes always
+
+    def visible(self, box : AABB, alpha : float):
+        res = []
+        beta = 1 - alpha
+
+        for body, x0, y0, ang0, x, y, ang, sleeping, bound in self.bodies:
+            if body.kind != PLANE and not bound.collide(box):
+                continue
+
+            res.append((body, Vector(x0 * beta + x * alpha, y0 * beta + y * alpha), ang0 * beta + ang * alpha, sleeping, bound))
+
+        return res
+
+# steps the scene on a background thread at the stepper's rate and publishes
+# a new Frame after every step. the renderer only ever reads the published
+# frame, the one being built is swapped in whole once done. anything that
+# touches the scene from another thread has to go through post(), commands
+# run on the physics thread before the next step.
+# on a GIL build the threads take turns rather than running in parallel, but
+# a slow step no longer holds up drawing and a slow draw no longer holds up
+# physics
+
+class Pipeline:
+    def __init__(self, stepper : Stepper):
+        self.stepper = stepper
+        self.scene = stepper.scene
+        self.commands : SimpleQueue = SimpleQueue()
+        self.frame = Frame(stepper, perf_counter())
+
+        self.thread : Thread = None
+        self.running = False
+        self.error : BaseException = None
+
+    def start(self):
+        if self.running:
+            return
+
+        self.running = True
+        self.thread = Thread(target=self.run, name="physics", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        if not self.running:
+            return
+
+        self.running = False
+        self.post(None)
+        self.thread.join()
+        self.thread = None
+
+    def post(self, command, *args):
+        self.commands.put((command, args))
+
+    def interact(self, left_click : bool, pos : Vector):
+        if left_click:
+            self.post(self.scene.interact, left_click, pos.copy())
+
+    # the most recently published frame. errors on the physics thread are
+    # raised here so they are not lost
+
+    def latest(self):
+        if self.error is not None:
+            raise self.error
+
+        return self.frame
+
+    def run_commands(self, timeout : float):
+        try:
+            command, args = self.commands.get(timeout=timeout)
+
+            while True:
+                if command is not None:
+                    command(*args)
+
+                command, args = self.commands.get_nowait()
+        except Empty:
+            pass
+
+    def run(self):
+        stepper = self.stepper
+        last = perf_counter()
+
+        try:
+            while self.running:
+                # sleep until the next step is due or a command comes in
+                self.run_commands(max(stepper.step_time - stepper.accumulator - (perf_counter() - last), 0))
+
+                now = perf_counter()
+                stepper.advance(now - last)
+                last = now
+
+                self.frame = Frame(stepper, now)
+        except BaseException as error:
+            self.error = error
+            self.running = False
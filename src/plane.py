@@ -1,6 +1,6 @@
 from .body import *
 from .linear_algebra import Vector
-from .collision import Collision
+from .collision import CollisionPool, manifold
 from math import atan2
 
 class Plane(Body):
@@ -21,7 +21,30 @@ class Plane(Body):
     def bound(self):
         pass
 
-    def collide(self, other : Body):
+    # the plane is solid behind its normal
+
+    def contains(self, point : Vector):
+        return (point - self.pos) * self.norm <= 0
+
+    def raycast(self, origin : Vector, direction : Vector, max_dist : float = float("inf")):
+        dist = (origin - self.pos) * self.norm
+
+        if dist <= 0:
+            return 0, -direction
+
+        speed = direction * self.norm
+
+        if speed >= 0:
+            return None
+
+        t = -dist / speed
+
+        if t > max_dist:
+            return None
+
+        return t, self.norm.copy()
+
+    def collide(self, other : Body, pool : CollisionPool = None):
         if other.kind == PLANE:
             pass
         elif other.kind == CIRCLE:
@@ -34,13 +57,14 @@ class Plane(Body):
                 contact1 = other.pos - self.norm * dist
                 contact2 = other.pos - self.norm * other.rad
 
-                return Collision(self, other, self.norm, depth, [contact1, contact2])
+                return manifold(pool, self, other, self.norm, depth, [contact1, contact2])
             
         elif other.kind == POLYGON:
             min_dist = 0
             contacts = []
+            features = []
 
-            for point in other.transformed_points:
+            for i, point in enumerate(other.transformed_points):
                 dpos = point - self.pos
 
                 dist = dpos * self.norm
@@ -50,8 +74,9 @@ class Plane(Body):
                 
                 if dist < 0:
                     contacts.append(point)
+                    features.append(i)
 
             if min_dist < 0:
                 depth = -min_dist
 
-                return Collision(self, other, self.norm, depth, contacts)
\ No newline at end of file
+                return manifold(pool, self, other, self.norm, depth, contacts, features)
\ No newline at end of file
@@ -1,6 +1,9 @@
 from .body import *
-from .linear_algebra import Vector, RotationMatrix
-from .collision import Collision
+from .linear_algebra import Vector
+from math import sin, cos
+from .collision import CollisionPool, manifold
+from .shape import PolygonShape, polygon_shape
+from weakref import WeakKeyDictionary
 import random
 import math
 
@@ -75,7 +78,7 @@ def random_convex(n : int, r : float):
     cur = Vector(0,0)
     res = []
     for i in range(n):
-        cur += vec[i]
+        cur = cur + vec[i]
         res.append(cur)
 
     return res
@@ -83,7 +86,7 @@ def random_convex(n : int, r : float):
 class Polygon(Body):
     def __init__(self, 
                  pos : Vector,
-                 points : list[Vector],
+                 points : list[Vector] | PolygonShape,
                  ang : float = 0,
                  inv_density : float = 1,
                  vel : Vector = Vector(0,0), 
@@ -92,171 +95,358 @@ class Polygon(Body):
                  mu_s : float = 0.5,
                  mu_d : float = 0.4):
                 
-        self.num_points = len(points)
-        
-        area = 0
-        centroid = Vector(0,0)
-        inertia = 0
+        # geometry is shared between polygons with the same points, see shape.py
+        shape = points if isinstance(points, PolygonShape) else polygon_shape(points)
+
+        self.shape = shape
+        self.num_points = shape.num_points
+        self.points = shape.points
+        self.normals = shape.normals
+        self.directions = shape.directions
+        self.winding = shape.winding
+
+        inv_mass = inv_density / shape.area
+        inv_inertia = 1 / shape.inertia
+
+        # last axis that separated this polygon from another one, as (owner, edge index).
+        # created on first use, most polygons in a big scene never need one
+        self.separating_axes : WeakKeyDictionary[Body, tuple[int, int]] = None
+
+        # rotation as a cos/sin pair and the points rotated by it, only redone when
+        # ang changes. world points and edges are built on first use after a move
+        self.rotation_ang = None
+        self.cos_theta = 1
+        self.sin_theta = 0
+        self.rotated_points : list[Vector] = shape.points
+        self.extents = shape.extents
+
+        self.world_pos = None
+        self.world_points : list[Vector] = None
+        self.world_edges : list[Vector] = None
 
-        for i in range(self.num_points):
-            p1 = points[i]
-            p2 = points[(i+1)%self.num_points]
+        super().__init__(POLYGON, pos, ang, inv_mass, inv_inertia, vel, ang_vel, e, mu_s, mu_d)
 
-            cross = p1 ^ p2
-            area += cross
-            centroid += cross * (p1 + p2)
-            inertia += cross * (p1 * p1 + p1 * p2 + p2 * p2)
+    def rotate(self, ang : float):
+        self.rotation_ang = ang
+        self.world_edges = None
 
-        area /= 2
-        centroid /= 6 * area
+        # unrotated polygons use the shape's own points and extents
+        if ang == 0:
+            self.cos_theta = 1
+            self.sin_theta = 0
+            self.rotated_points = self.points
+            self.extents = self.shape.extents
+            return
 
-        area = abs(area)
+        self.cos_theta = cos_theta = cos(ang)
+        self.sin_theta = sin_theta = sin(ang)
 
-        points = [point - centroid for point in points]
+        self.rotated_points = rotated = [Vector(p.x * cos_theta - p.y * sin_theta, p.x * sin_theta + p.y * cos_theta) for p in self.points]
 
-        for i in range(self.num_points):
-            p1 = points[i]
-            p2 = points[(i+1)%self.num_points]
+        min_x = max_x = rotated[0].x
+        min_y = max_y = rotated[0].y
 
-            cross = p1 ^ p2
-            inertia += cross * (p1 * p1 + p1 * p2 + p2 * p2)
+        for p in rotated:
+            min_x = min(min_x, p.x)
+            min_y = min(min_y, p.y)
+            max_x = max(max_x, p.x)
+            max_y = max(max_y, p.y)
 
-        inertia /= 12
-        inertia = abs(inertia)
+        self.extents = (min_x, min_y, max_x, max_y)
 
-        inv_mass = inv_density / area
-        inv_inertia = 1 / inertia
+    def bound(self):
+        ang = self.ang
 
-        self.points = points
+        if ang != self.rotation_ang:
+            self.rotate(ang)
+            self.world_points = None
 
-        super().__init__(POLYGON, pos, ang, inv_mass, inv_inertia, vel, ang_vel, e, mu_s, mu_d)
+        x = self.pos.x
+        y = self.pos.y
 
-    def bound(self):
-        self.rotation_matrix = RotationMatrix(self.ang)
-        self.transformed_points = [point * self.rotation_matrix + self.pos for point in self.points]
-        self.edges : list[Vector] = []
+        if (x, y) != self.world_pos:
+            self.world_pos = (x, y)
+            self.world_points = None
+
+        min_x, min_y, max_x, max_y = self.extents
+        self.AABB.update(x + min_x, y + min_y, x + max_x, y + max_y)
+
+    # world geometry as of the last bound(). these are fresh lists of fresh
+    # vectors each time, contacts may hold on to the old ones
+
+    @property
+    def transformed_points(self):
+        if self.world_points is None:
+            x, y = self.world_pos
+            self.world_points = [Vector(p.x + x, p.y + y) for p in self.rotated_points]
+
+        return self.world_points
+
+    @property
+    def edges(self):
+        if self.world_edges is None:
+            cos_theta = self.cos_theta
+            sin_theta = self.sin_theta
+            self.world_edges = [Vector(d.x * cos_theta - d.y * sin_theta, d.x * sin_theta + d.y * cos_theta) for d in self.directions]
+
+        return self.world_edges
 
-        min_x = max_x = self.transformed_points[0].x
-        min_y = max_y = self.transformed_points[0].y
+    # point and ray tests are done in local space against the edges, whose
+    # outward normals are the stored normals flipped by the winding
 
-        p1 = self.transformed_points[0]
-        p2 = self.transformed_points[1]
-        self.edges.append((p2 - p1).normalized())
+    def to_local(self, point : Vector):
+        dx = point.x - self.pos.x
+        dy = point.y - self.pos.y
+        return Vector(dx * self.cos_theta + dy * self.sin_theta, dy * self.cos_theta - dx * self.sin_theta)
 
-        for i in range(1, self.num_points):
-            p1 = self.transformed_points[i]
-            p2 = self.transformed_points[(i+1)%self.num_points]
+    def contains(self, point : Vector):
+        local = self.to_local(point)
+        winding = self.winding
 
-            min_x = min(min_x, p1.x)
-            min_y = min(min_y, p1.y)
-            max_x = max(max_x, p1.x)
-            max_y = max(max_y, p1.y)
+        for p, normal in zip(self.points, self.normals):
+            if winding * ((p.x - local.x) * normal.x + (p.y - local.y) * normal.y) > 0:
+                return False
 
-            self.edges.append((p2 - p1).normalized())
+        return True
 
-        self.AABB.update(min_x, min_y, max_x, max_y)
+    def raycast(self, origin : Vector, direction : Vector, max_dist : float = INF):
+        local = self.to_local(origin)
+        dx = direction.x * self.cos_theta + direction.y * self.sin_theta
+        dy = direction.y * self.cos_theta - direction.x * self.sin_theta
+        winding = self.winding
 
-    def project(self, norm : Vector):
-        min_dist = INF
-        min_idx = 0
-        max_dist = -INF
-        max_idx = 0
+        t_enter = 0
+        t_exit = max_dist
+        enter_idx = None
 
         for i in range(self.num_points):
-            p = self.transformed_points[i]
+            p = self.points[i]
+            normal = self.normals[i]
+
+            # distance of the edge ahead of the origin and closing speed along
+            # the outward normal, which is -winding * normal
+            dist = -winding * ((p.x - local.x) * normal.x + (p.y - local.y) * normal.y)
+            speed = -winding * (dx * normal.x + dy * normal.y)
+
+            if speed == 0:
+                if dist < 0:
+                    return None
+                continue
+
+            t = dist / speed
+
+            if speed < 0:
+                if t > t_enter:
+                    t_enter = t
+                    enter_idx = i
+            elif t < t_exit:
+                t_exit = t
+
+            if t_enter > t_exit:
+                return None
+
+        if enter_idx is None:
+            return 0, -direction
+
+        norm = self.axis(enter_idx)
+        norm *= -winding
+
+        return t_enter, norm
+
+    def climb(self, dx, dy, i, sign):
+        # hill climb to the vertex furthest along sign * (dx, dy). the
+        # projection is unimodal around a convex polygon, and ties resolve to
+        # the lowest index like a full linear scan would
+        points = self.transformed_points
+        n = self.num_points
+
+        p = points[i]
+        dist_i = sign * (p.x * dx + p.y * dy)
+
+        j = i+1 if i+1 < n else 0
+        p = points[j]
+        dist_j = sign * (p.x * dx + p.y * dy)
+
+        if dist_j > dist_i:
+            while dist_j > dist_i:
+                i = j
+                dist_i = dist_j
+
+                j = i+1 if i+1 < n else 0
+                p = points[j]
+                dist_j = sign * (p.x * dx + p.y * dy)
+
+            if dist_j == dist_i and j < i:
+                i = j
 
-            dist = p * norm
+            return i, sign * dist_i
 
-            if dist < min_dist:
-                min_dist = dist
-                min_idx = i
+        k = i-1 if i > 0 else n-1
+        p = points[k]
+        dist_k = sign * (p.x * dx + p.y * dy)
 
-            if dist > max_dist:
-                max_dist = dist
-                max_idx = i
+        if dist_k > dist_i:
+            while dist_k > dist_i:
+                i = k
+                dist_i = dist_k
+
+                k = i-1 if i > 0 else n-1
+                p = points[k]
+                dist_k = sign * (p.x * dx + p.y * dy)
+
+            if dist_k == dist_i and k < i:
+                i = k
+
+            return i, sign * dist_i
+
+        if dist_j == dist_i and j < i:
+            i = j
+        elif dist_k == dist_i and k < i:
+            i = k
+
+        return i, sign * dist_i
+
+    def project(self, norm : Vector, min_hint=0, max_hint=0):
+        min_idx, min_dist = self.climb(norm.x, norm.y, min_hint, -1)
+        max_idx, max_dist = self.climb(norm.x, norm.y, max_hint, 1)
 
         return min_idx, min_dist, max_idx, max_dist
 
-    def collide(self, other : Body):
+    def axis(self, i):
+        normal = self.normals[i]
+        cos_theta = self.cos_theta
+        sin_theta = self.sin_theta
+
+        return Vector(normal.x * cos_theta - normal.y * sin_theta, normal.x * sin_theta + normal.y * cos_theta)
+
+    def collide(self, other : Body, pool : CollisionPool = None):
         if not self.AABB.collide(other.AABB):
+            Body.aabb_rejections += 1
             return
         
         if other.kind == PLANE:
-            return other.collide(self)
+            return other.collide(self, pool)
         elif other.kind == CIRCLE:
-            min_dist = INF
-            norm : Vector = Vector(0,0)
-
-            for i in range(self.num_points):
-                p1 = self.transformed_points[i]
-                p2 = self.transformed_points[(i+1)%self.num_points]
+            # separation of the centre from each edge, in local space. the
+            # circle is clear as soon as one edge is further than its radius
+            rad = other.rad
+            cos_theta = self.cos_theta
+            sin_theta = self.sin_theta
+            winding = self.winding
+            points = self.points
+            normals = self.normals
+            num_points = self.num_points
+
+            dx = other.pos.x - self.pos.x
+            dy = other.pos.y - self.pos.y
+            cx = dx * cos_theta + dy * sin_theta
+            cy = dy * cos_theta - dx * sin_theta
+
+            max_sep = -INF
+            idx = 0
+
+            for i in range(num_points):
+                p = points[i]
+                normal = normals[i]
+                sep = winding * ((p.x - cx) * normal.x + (p.y - cy) * normal.y)
+
+                if sep > rad:
+                    return
 
-                edge = self.edges[i]
+                if sep > max_sep:
+                    max_sep = sep
+                    idx = i
+
+            # the closest feature is on the edge of maximum separation: one of
+            # its vertices if the centre is past that end of it, otherwise the
+            # edge itself. a centre inside the polygon is pushed out of that edge
+            p1 = points[idx]
+            p2 = points[idx+1 if idx+1 < num_points else 0]
+            ex = p2.x - p1.x
+            ey = p2.y - p1.y
+
+            if max_sep > 0 and (cx - p1.x) * ex + (cy - p1.y) * ey < 0:
+                vertex = p1
+            elif max_sep > 0 and (cx - p2.x) * ex + (cy - p2.y) * ey > 0:
+                vertex = p2
+            else:
+                vertex = None
 
-                dpos = other.pos - p1
+            if vertex is None:
+                dist = max_sep
+                normal = normals[idx]
+                nx = -winding * normal.x
+                ny = -winding * normal.y
+            else:
+                nx = cx - vertex.x
+                ny = cy - vertex.y
+                sqr_dist = nx * nx + ny * ny
 
-                axis = edge.perpendicular()
+                if sqr_dist > rad * rad:
+                    return
 
-                dist = dpos * axis
-                closest = other.pos - axis * dist
+                dist = sqr_dist ** 0.5
+                nx /= dist
+                ny /= dist
 
-                if (closest - p1) * edge < 0:
-                    closest = p1
-                elif (closest - p2) * edge > 0:
-                    closest = p2
+            norm = Vector(nx * cos_theta - ny * sin_theta, nx * sin_theta + ny * cos_theta)
+            depth = rad - dist
 
-                dpos = other.pos - closest
+            contact1 = other.pos - norm * dist
+            contact2 = other.pos - norm * rad
 
-                if dpos.squared_length() <= other.rad ** 2:
-                    axis = dpos.normalized()
+            return manifold(pool, self, other, norm, depth, [contact1, contact2])
 
-                    if axis * (other.pos - self.pos) < 0:
-                        axis = -axis
+        elif other.kind == POLYGON:
+            # try last frame's separating axis first, it usually still separates
+            cached = self.separating_axes.get(other) if self.separating_axes is not None else None
 
-                    dist = dpos * axis
-                    
-                    if dist < min_dist:
-                        min_dist = dist
-                        norm = axis
+            if cached is not None:
+                owner, i = cached
+                axis = self.axis(i) if owner == 0 else other.axis(i)
+                _, min_dist_A, _, max_dist_A = self.project(axis)
+                _, min_dist_B, _, max_dist_B = other.project(axis)
 
-            if min_dist == INF:
-                return
-            
-            depth = other.rad - min_dist
-                                    
-            contact1 = other.pos - norm * (other.rad - depth)
-            contact2 = other.pos - norm * other.rad
+                if max_dist_A < min_dist_B or min_dist_A > max_dist_B:
+                    return
 
-            return Collision(self, other, norm, depth, [contact1, contact2])
+                # the axis no longer separates, full SAT below finds a new one if any
+                del self.separating_axes[other]
 
-        elif other.kind == POLYGON:
             depth = INF
             norm : Vector = Vector(0,0)
             support_idx_A = 0
             support_idx_B = 0
 
-            for edge in self.edges + other.edges:
-                axis = edge.perpendicular()
-                min_idx_A, min_dist_A, max_idx_A, max_dist_A = self.project(axis)
-                min_idx_B, min_dist_B, max_idx_B, max_dist_B = other.project(axis)
+            min_idx_A = max_idx_A = min_idx_B = max_idx_B = 0
 
-                if max_dist_A < min_dist_B or min_dist_A > max_dist_B:
-                    return
-                
-                if max_dist_A < max_dist_B:
-                    overlap = max_dist_A - min_dist_B
-                    idx_A = max_idx_A
-                    idx_B = min_idx_B
-                else:
-                    overlap = max_dist_B - min_dist_A
-                    idx_A = min_idx_A
-                    idx_B = max_idx_B
-
-                if overlap < depth:
-                    depth = overlap
-                    norm = axis
-                    support_idx_A = idx_A
-                    support_idx_B = idx_B
+            for owner, body in ((0, self), (1, other)):
+                for i in range(body.num_points):
+                    axis = body.axis(i)
+                    min_idx_A, min_dist_A, max_idx_A, max_dist_A = self.project(axis, min_idx_A, max_idx_A)
+                    min_idx_B, min_dist_B, max_idx_B, max_dist_B = other.project(axis, min_idx_B, max_idx_B)
+
+                    if max_dist_A < min_dist_B or min_dist_A > max_dist_B:
+                        if self.separating_axes is None:
+                            self.separating_axes = WeakKeyDictionary()
+
+                        self.separating_axes[other] = (owner, i)
+                        return
+
+                    if max_dist_A < max_dist_B:
+                        overlap = max_dist_A - min_dist_B
+                        idx_A = max_idx_A
+                        idx_B = min_idx_B
+                    else:
+                        overlap = max_dist_B - min_dist_A
+                        idx_A = min_idx_A
+                        idx_B = max_idx_B
+
+                    if overlap < depth:
+                        depth = overlap
+                        norm = axis
+                        support_idx_A = idx_A
+                        support_idx_B = idx_B
 
             dpos = other.pos - self.pos
             if norm * dpos < 0:
@@ -325,15 +515,18 @@ class Polygon(Body):
             if inc_p1 is None: return
 
             contacts = []
+            features = []
 
             if (inc_p1 - ref_p1) * norm < 0:
                 contacts.append(inc_p1)
+                features.append((flip, support_idx_A, support_idx_B, 0))
 
             if (inc_p2 - ref_p2) * norm < 0:
                 contacts.append(inc_p2)
+                features.append((flip, support_idx_A, support_idx_B, 1))
 
             if contacts:
                 if flip:
                     norm = -norm
             
-                return Collision(self, other, norm, depth, contacts)
\ No newline at end of file
+                return manifold(pool, self, other, norm, depth, contacts, features)
\ No newline at end of file
@@ -0,0 +1,50 @@
+PHASES = ("integrate", "broadphase", "narrowphase", "solve", "sleep")
+
+# what one profiled Scene.update did. times are wall clock seconds per phase
+
+class StepStats:
+    __slots__ = ("times", "num_bodies", "num_pairs", "aabb_rejections", "num_hits", "num_contacts", "iterations")
+
+    def __init__(self):
+        self.times : dict[str, float] = dict.fromkeys(PHASES, 0)
+        self.num_bodies = 0
+        self.num_pairs = 0
+        self.aabb_rejections = 0
+        self.num_hits = 0
+        self.num_contacts = 0
+        self.iterations = 0
+
+    def total(self):
+        return sum(self.times.values())
+
+    def as_dict(self):
+        return {
+            "times": dict(self.times),
+            "total": self.total(),
+            "bodies": self.num_bodies,
+            "pairs": self.num_pairs,
+            "aabb_rejections": self.aabb_rejections,
+            "hits": self.num_hits,
+            "contacts": self.num_contacts,
+            "iterations": self.iterations,
+        }
+
+def average(stats : list[StepStats]):
+    res = StepStats()
+    n = len(stats)
+
+    if n == 0:
+        return res
+
+    for s in stats:
+        for phase in PHASES:
+            res.times[phase] += s.times[phase] / n
+
+        res.num_bodies += s.num_bodies / n
+        res.num_pairs += s.num_pairs / n
+        res.aabb_rejections += s.aabb_rejections / n
+        res.num_hits += s.num_hits / n
+        res.num_contacts += s.num_contacts / n
+        res.iterations += s.iterations / n
+
+    return res
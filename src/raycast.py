@@ -0,0 +1,12 @@
+from .linear_algebra import Vector
+from .body import Body
+
+class RayHit:
+    def __init__(self, body : Body, point : Vector, norm : Vector, dist : float):
+        self.body = body
+        self.point = point
+        self.norm = norm
+        self.dist = dist
+
+    def __repr__(self):
+        return f"RayHit({self.body.__class__.__name__}, {self.point}, {self.norm}, {self.dist})"
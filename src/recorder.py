@@ -0,0 +1,184 @@
+from .body import Body
+from array import array
+from struct import Struct
+import mmap
+import sys
+
+# trajectory files: a 64-byte header followed by one frame per recorded step.
+# a frame holds FIELDS doubles for each of the first num_bodies bodies, in
+# the byte order given in the header. bodies added after recording started
+# are not recorded.
+#
+# the file is memory mapped and grown by doubling, so recording costs one
+# copy of a frame into the map and Python memory stays flat however long
+# the run is
+
+MAGIC = b"IMPT"
+VERSION = 1
+
+HEADER = Struct("<4sIcxxxIIQ36x")
+STEPS = Struct("<Q")
+STEPS_OFFSET = 20
+
+FIELDS = ("x", "y", "ang", "vel_x", "vel_y", "ang_vel")
+NUM_FIELDS = len(FIELDS)
+
+BYTEORDER = b"<" if sys.byteorder == "little" else b">"
+
+class Recorder:
+    def __init__(self, path : str, num_bodies : int, capacity : int = 1024):
+        self.path = path
+        self.num_bodies = num_bodies
+        self.frame_size = num_bodies * NUM_FIELDS
+        self.num_steps = 0
+        self.capacity = 0
+
+        self.file = open(path, "w+b")
+        self.mmap : mmap.mmap = None
+        self.view : memoryview = None
+
+        self.reserve(max(capacity, 1))
+
+    def reserve(self, capacity : int):
+        if capacity <= self.capacity:
+            return
+
+        self.release()
+
+        self.file.truncate(HEADER.size + capacity * self.frame_size * 8)
+        self.mmap = mmap.mmap(self.file.fileno(), 0)
+        self.view = memoryview(self.mmap)[HEADER.size:].cast("d")
+        self.capacity = capacity
+
+        HEADER.pack_into(self.mmap, 0, MAGIC, VERSION, BYTEORDER, self.num_bodies, NUM_FIELDS, self.num_steps)
+
+    def release(self):
+        if self.mmap is None:
+            return
+
+        self.view.release()
+        self.mmap.flush()
+        self.mmap.close()
+
+        self.view = None
+        self.mmap = None
+
+    def attach(self, scene):
+        scene.step_listeners.append(self.record)
+
+    def detach(self, scene):
+        scene.step_listeners.remove(self.record)
+
+    def record(self, scene):
+        self.record_bodies(scene.bodies)
+
+    def record_bodies(self, bodies : list[Body]):
+        if len(bodies) < self.num_bodies:
+            raise ValueError(f"recording {self.num_bodies} bodies but only {len(bodies)} exist")
+
+        if self.num_steps == self.capacity:
+            self.reserve(2 * self.capacity)
+
+        frame = array("d")
+
+        for i in range(self.num_bodies):
+            body = bodies[i]
+            pos = body.pos
+            vel = body.vel
+            frame.extend((pos.x, pos.y, body.ang, vel.x, vel.y, body.ang_vel))
+
+        start = self.num_steps * self.frame_size
+        self.view[start:start + self.frame_size] = frame
+
+        # keep the header current so a crashed run is still readable
+        self.num_steps += 1
+        STEPS.pack_into(self.mmap, STEPS_OFFSET, self.num_steps)
+
+    def close(self):
+        if self.file.closed:
+            return
+
+        self.release()
+        self.file.truncate(HEADER.size + self.num_steps * self.frame_size * 8)
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+# read side. frames are memoryviews into the map (or copies when the file was
+# written with the other byte order) and stay valid until the trajectory is
+# closed. as_numpy() gives a (steps, bodies, FIELDS) array view without copying
+
+class Trajectory:
+    def __init__(self, path : str):
+        self.file = open(path, "rb")
+        self.mmap = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, byteorder, num_bodies, num_fields, num_steps = HEADER.unpack_from(self.mmap)
+
+        if magic != MAGIC:
+            raise ValueError("not a trajectory file")
+        if version != VERSION:
+            raise ValueError(f"unsupported trajectory version {version}")
+
+        self.byteorder = byteorder.decode()
+        self.num_bodies = num_bodies
+        self.num_fields = num_fields
+        self.frame_size = num_bodies * num_fields
+
+        # a file from a run that is still going may be mapped past what was written
+        available = (len(self.mmap) - HEADER.size) // (8 * self.frame_size) if self.frame_size else 0
+        self.num_steps = min(num_steps, available)
+
+        self.view = memoryview(self.mmap)[HEADER.size:HEADER.size + self.num_steps * self.frame_size * 8].cast("d")
+
+    def __len__(self):
+        return self.num_steps
+
+    def frame(self, i : int):
+        if not 0 <= i < self.num_steps:
+            raise IndexError("frame index out of range")
+
+        frame = self.view[i * self.frame_size:(i+1) * self.frame_size]
+
+        if self.byteorder.encode() != BYTEORDER:
+            frame = array("d", frame)
+            frame.byteswap()
+
+        return frame
+
+    def __iter__(self):
+        for i in range(self.num_steps):
+            yield self.frame(i)
+
+    def as_numpy(self):
+        import numpy as np
+
+        return np.frombuffer(self.mmap, dtype=self.byteorder + "f8", count=self.num_steps * self.frame_size,
+                             offset=HEADER.size).reshape(self.num_steps, self.num_bodies, self.num_fields)
+
+    def close(self):
+        if self.file.closed:
+            return
+
+        self.view.release()
+
+        try:
+            self.mmap.close()
+        except BufferError:
+            pass # frames or arrays handed out still use it, it closes once they are gone
+
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+def read_trajectory(path : str):
+    with Trajectory(path) as trajectory:
+        yield from trajectory
@@ -0,0 +1,132 @@
+from .linear_algebra import Vector
+from .body import Body
+
+# level of detail stepping around one or more focus points, e.g. the camera.
+# dynamic bodies within near_radius of a focus step every update, those
+# within far_radius step every interval updates with interval times the
+# timestep, and those further out are frozen and do not step at all.
+#
+# a body that is not stepped in an update is held: it keeps its state, is
+# not paired with other held or resting bodies, and acts as an immovable
+# obstacle for the bodies that are stepped. each body counts the updates it
+# has been held while in the far tier and takes them all in its next step,
+# including the one it makes on moving closer, so bodies change tier without
+# jumping. frozen bodies lose no time either, time just stops for them.
+# far bodies step on the same updates so that piles of them stay in phase.
+# held bodies do not count towards falling asleep, their velocity is only
+# stale, and a sleeping body is woken when it comes out of the frozen tier
+
+NEAR = 0
+FAR = 1
+FROZEN = 2
+
+class Regions:
+    def __init__(self,
+                 focus : list[Vector] = None,
+                 near_radius : float = 50,
+                 far_radius : float = 150,
+                 interval : int = 4,
+                 margin : float = 2):
+
+        self.focus : list[Vector] = focus or []
+        self.near_radius = near_radius
+        self.far_radius = far_radius
+        self.interval = interval
+
+        # a body only changes tier once it is margin past a boundary, so bodies
+        # sitting on one do not flicker between rates
+        self.margin = margin
+
+        self.num_updates = 0
+        self.tiers : dict[Body, int] = {}
+        self.behind : dict[Body, int] = {}
+
+        # bodies stepped in the current update with their timesteps, and the ones held
+        self.steps : list[tuple[Body, float]] = []
+        self.moving : list[Body] = []
+        self.held : set[Body] = set()
+        self.saved : list[tuple[Body, float, float]] = []
+
+    def remove(self, body : Body):
+        self.tiers.pop(body, None)
+        self.behind.pop(body, None)
+
+    def set_focus(self, focus : list[Vector]):
+        self.focus = [point.copy() for point in focus]
+
+    def tier(self, body : Body, current : int):
+        if not self.focus:
+            return NEAR
+
+        x = body.pos.x
+        y = body.pos.y
+        sqr_dist = min((point.x - x) ** 2 + (point.y - y) ** 2 for point in self.focus)
+
+        near = self.near_radius + (self.margin if current == NEAR else -self.margin)
+        far = self.far_radius + (self.margin if current != FROZEN else -self.margin)
+
+        if sqr_dist <= near * near:
+            return NEAR
+        if sqr_dist <= far * far:
+            return FAR
+
+        return FROZEN
+
+    # sorts the awake dynamic bodies into moving and held for this update and
+    # returns the moving ones with the timestep each of them takes
+
+    def update(self, bodies : list[Body], delta_time : float):
+        tiers = self.tiers
+        behind = self.behind
+        far_update = self.num_updates % self.interval == 0
+        self.num_updates += 1
+
+        steps = []
+        moving = []
+        held = set()
+
+        for body in bodies:
+            last_tier = tiers.get(body, NEAR)
+            tier = self.tier(body, last_tier)
+            tiers[body] = tier
+
+            if body.sleeping:
+                if last_tier == FROZEN and tier != FROZEN:
+                    body.wake()
+                else:
+                    continue
+
+            if tier == NEAR or (tier == FAR and far_update):
+                steps.append((body, (behind.pop(body, 0) + 1) * delta_time))
+                moving.append(body)
+            else:
+                held.add(body)
+
+                if tier == FAR:
+                    behind[body] = behind.get(body, 0) + 1
+
+        self.steps = steps
+        self.moving = moving
+        self.held = held
+
+        return steps
+
+    # held bodies take part in contacts as if static while the solver runs
+
+    def hold(self, collisions : list):
+        held = self.held
+        saved = self.saved
+
+        for collision in collisions:
+            for body in (collision.A, collision.B):
+                if body in held and body.inv_mass != 0:
+                    saved.append((body, body.inv_mass, body.inv_inertia))
+                    body.inv_mass = 0
+                    body.inv_inertia = 0
+
+    def release(self):
+        for body, inv_mass, inv_inertia in self.saved:
+            body.inv_mass = inv_mass
+            body.inv_inertia = inv_inertia
+
+        self.saved.clear()
@@ -1,47 +1,393 @@
 from .linear_algebra import Vector
 from .body import *
-from .circle import Circle
+from .circle import Circle, collide_circles, HAVE_NUMPY
 from .polygon import Polygon, random_convex
-from .collision import Collision
+from .collision import Collision, CollisionPool
+from .AABB import AABB, INF
+from .raycast import RayHit
+from .ccd import time_of_impact
+from .broadphase import Broadphase, SweepAndPrune
+from .static import StaticGeometry
+from .regions import Regions
+from .island import build_islands
+from .solver import Solver, SequentialImpulseSolver
+from .profiling import StepStats
+from . import snapshot
+from collections import deque
+from time import perf_counter
 from math import sin,cos,pi
 import random
 
 class Scene:
-    def __init__(self, bodies : list[Body] = [], gravity : Vector = Vector(0,-9.8)):
+    def __init__(self, bodies : list[Body] = [], gravity : Vector = Vector(0,-9.8), broadphase : Broadphase = None, solver : Solver = None, regions : Regions = None,
+                 allow_sleep : bool = True, sleep_linear : float = 0.05, sleep_angular : float = 0.05, time_to_sleep : float = 0.5):
         self.gravity = gravity
         self.bodies : list[Body] = bodies
+        self.broadphase : Broadphase = broadphase or SweepAndPrune()
+        self.solver : Solver = solver or (SequentialImpulseSolver() if allow_sleep else Solver())
         self.collisions : list[Collision] = []
 
+        # manifolds are reused from step to step, so the ones in collisions are
+        # only valid until the next update. see contacts()
+        self.pool = CollisionPool()
+
+        # circle-circle pairs per step from which the narrowphase collides
+        # them in one numpy pass, see collide_circles
+        self.min_circle_batch = 256
+
+        # bodies split by whether they can move. only dynamic ones go through the
+        # broadphase, static ones are in static (see static.py). bodies appended
+        # to self.bodies are sorted in on the next step, take bodies out with
+        # remove(). call rebuild_static after changing a body's inv_mass to or
+        # from 0, moving a static body or editing self.bodies other than by
+        # appending
+        self.dynamic : list[Body] = []
+        self.static = StaticGeometry()
+        self.num_sorted = 0
+
+        # optional level of detail stepping around focus points, see regions.py
+        self.regions : Regions = regions
+
+        # islands whose bodies stay below both velocities for time_to_sleep seconds fall asleep.
+        # the single pass of the plain Solver leaves piles jittering well above
+        # them, so scenes that allow sleep default to SequentialImpulseSolver.
+        # a pile only sleeps with a solver that lets it come to rest
+        self.allow_sleep = allow_sleep
+        self.sleep_linear = sleep_linear
+        self.sleep_angular = sleep_angular
+        self.time_to_sleep = time_to_sleep
+
         self.paused = False
 
+        # profiling, off by default. while on every update records a StepStats
+        # into the rolling stats buffer and passes it to each subscriber
+        self.profiling = False
+        self.stats : deque[StepStats] = deque(maxlen=120)
+        self.subscribers : list = []
+
+        # called with the scene after every update, e.g. Recorder.record
+        self.step_listeners : list = []
+
     def update(self, delta_time):
         if self.paused: 
             return
-        
-        num_bodies = len(self.bodies)
 
-        for body in self.bodies:
-            body.step(delta_time, self.gravity)
+        if self.profiling:
+            self.profiled_update(delta_time)
+        else:
+            self.integrate(delta_time)
+            self.detect()
+            self.solve(delta_time)
+
+            if self.allow_sleep:
+                self.update_sleep(delta_time)
+
+        for listener in self.step_listeners:
+            listener(self)
+
+        return self.collisions
+
+    def enable_profiling(self, history : int = 120):
+        self.profiling = True
+
+        if self.stats.maxlen != history:
+            self.stats = deque(self.stats, maxlen=history)
+
+    def disable_profiling(self):
+        self.profiling = False
+
+    def subscribe(self, callback):
+        self.subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        self.subscribers.remove(callback)
+
+    def profiled_update(self, delta_time):
+        stats = StepStats()
+        times = stats.times
+
+        t0 = perf_counter()
+        self.integrate(delta_time)
+        t1 = perf_counter()
+        pairs = self.find_pairs()
+        rejections = Body.aabb_rejections
+        t2 = perf_counter()
+        self.narrowphase(pairs)
+        t3 = perf_counter()
+        rejections = Body.aabb_rejections - rejections
+        self.solve(delta_time)
+        t4 = perf_counter()
+
+        if self.allow_sleep:
+            self.update_sleep(delta_time)
+
+        t5 = perf_counter()
+
+        times["integrate"] = t1 - t0
+        times["broadphase"] = t2 - t1
+        times["narrowphase"] = t3 - t2
+        times["solve"] = t4 - t3
+        times["sleep"] = t5 - t4
+
+        # counted after the timed phases so they do not skew the times
+        stats.num_bodies = len(self.bodies)
+        stats.num_pairs = len(pairs)
+        stats.aabb_rejections = rejections
+        stats.num_hits = len(self.collisions)
+        stats.num_contacts = sum(len(collision.contacts) for collision in self.collisions)
+        stats.iterations = self.solver.iterations
+
+        self.stats.append(stats)
+
+        for callback in self.subscribers:
+            callback(stats)
+
+    def integrate(self, delta_time):
+        self.sort_bodies()
+
+        # with regions only the bodies they pick are stepped, each by its own
+        # timestep
+        steps = self.regions.update(self.dynamic, delta_time) if self.regions is not None else None
+        moving = self.dynamic if steps is None else self.regions.moving
+
+        bullets = [body for body in moving if body.bullet and not body.sleeping]
+        starts = [(body.pos.x, body.pos.y, body.ang, AABB(body.AABB.x1, body.AABB.y1, body.AABB.x2, body.AABB.y2)) for body in bullets]
+
+        if steps is not None:
+            for body, body_delta_time in steps:
+                body.step(body_delta_time, self.gravity)
+        else:
+            for body in self.dynamic:
+                body.step(delta_time, self.gravity)
+
+        for body, (x, y, ang, box) in zip(bullets, starts):
+            self.sweep(body, (x, y, ang), box)
+
+    # pulls a bullet back to where its motion over the step first hit something
+
+    def sweep(self, body : Body, start : tuple[float, float, float], start_box : AABB):
+        swept = start_box.union(body.AABB)
+        candidates = [other for other in self.query_aabb(swept) if other is not body]
+
+        if candidates:
+            time_of_impact(body, candidates, start)
+
+    def sort_bodies(self):
+        for i in range(self.num_sorted, len(self.bodies)):
+            body = self.bodies[i]
+
+            if body.inv_mass == 0:
+                self.static.add(body)
+            else:
+                self.dynamic.append(body)
+
+        self.num_sorted = len(self.bodies)
+
+    # takes a body out of the scene and out of the broadphase, static geometry
+    # and regions it was sorted into. the bodies around it are woken, so that
+    # none is left asleep resting on it
+
+    def remove(self, body : Body):
+        i = self.bodies.index(body)
+        del self.bodies[i]
+
+        if body.sleeping:
+            body.wake()
+
+        for other in self.dynamic:
+            if other.sleeping and other.AABB.collide(body.AABB):
+                other.wake()
+
+        if i >= self.num_sorted:
+            return
+
+        self.num_sorted -= 1
 
+        if body in self.static.bodies:
+            self.static.remove(body)
+        else:
+            self.dynamic.remove(body)
+            self.broadphase.remove(body)
+
+            if self.regions is not None:
+                self.regions.remove(body)
+
+    def rebuild_static(self):
+        self.dynamic = []
+        self.static = StaticGeometry()
+        self.num_sorted = 0
+        self.broadphase.reset()
+        self.sort_bodies()
+
+    def find_pairs(self):
+        self.sort_bodies()
+        moving = self.dynamic if self.regions is None else self.regions.moving
+        return self.broadphase.pairs(self.dynamic) + self.static.pairs(moving)
+
+    def detect(self):
+        self.narrowphase(self.find_pairs())
+
+    def narrowphase(self, pairs : list[tuple[Body, Body]]):
+        pool = self.pool
+        pool.release()
         self.collisions = []
-        for i in range(num_bodies-1):
-            A = self.bodies[i]
+        held = self.regions.held if self.regions is not None else ()
+
+        # resting bodies cannot gain contacts among themselves, nor can
+        # bodies held by the regions this step
+        pairs = [(A, B) for A, B in pairs
+                 if not ((A.sleeping or A.inv_mass == 0 or A in held) and (B.sleeping or B.inv_mass == 0 or B in held))]
 
-            for j in range(i+1, num_bodies):
-                B = self.bodies[j]
+        # circle pairs are batched when there are enough of them. their
+        # manifolds are taken back in pair order, so the contacts and the
+        # solve come out the same as without numpy
+        circles = [(A, B) for A, B in pairs if A.kind == CIRCLE and B.kind == CIRCLE]
 
-                collision = A.collide(B)
+        if HAVE_NUMPY and len(circles) >= self.min_circle_batch:
+            batched = iter(collide_circles(circles, pool))
+        else:
+            batched = None
 
-                if collision is not None:
-                    self.collisions.append(collision)
-    
+        for A, B in pairs:
+            if batched is not None and A.kind == CIRCLE and B.kind == CIRCLE:
+                collision = next(batched)
+            else:
+                collision = A.collide(B, pool)
+
+            if collision is not None:
+                self.collisions.append(collision)
+
+        # a new contact with an awake body wakes the whole sleeping island
         for collision in self.collisions:
-            collision.resolve()
+            if collision.A.sleeping:
+                collision.A.wake()
+            if collision.B.sleeping:
+                collision.B.wake()
 
-        return self.collisions
+    # every contact point of the current step as (collision, point, norm, depth),
+    # without copying. they are reused by the next update, copy what you keep
+
+    def contacts(self):
+        for collision in self.collisions:
+            norm = collision.norm
+            depth = collision.depth
+
+            for point in collision.contacts:
+                yield collision, point, norm, depth
+
+    def solve(self, delta_time):
+        if self.regions is None:
+            self.solver.solve(self.collisions, delta_time)
+            return
+
+        self.regions.hold(self.collisions)
+
+        try:
+            self.solver.solve(self.collisions, delta_time)
+        finally:
+            self.regions.release()
+
+    def update_sleep(self, delta_time):
+        # resting contacts bounce by about one step of gravity every frame,
+        # so that much speed is treated as being at rest
+        gravity = self.gravity.length()
+        sleep_linear = self.sleep_linear + gravity * delta_time
+        awake = []
+
+        # with regions, bodies held this step keep their sleep time and their
+        # islands stay awake. moving ones are judged by the timestep they took
+        held = self.regions.held if self.regions is not None else ()
+        step_times = dict(self.regions.steps) if self.regions is not None else None
+
+        for body in self.dynamic:
+            if body.sleeping:
+                continue
+
+            awake.append(body)
+
+            if body in held:
+                continue
+
+            step_time = delta_time
+            limit = sleep_linear
+
+            if step_times is not None and body in step_times:
+                step_time = step_times[body]
+                limit = self.sleep_linear + gravity * step_time
+
+            if body.vel.squared_length() > limit ** 2 or abs(body.ang_vel) > self.sleep_angular:
+                body.sleep_time = 0
+            else:
+                body.sleep_time += step_time
+
+        for island in build_islands(awake, self.collisions):
+            if held and any(body in held for body in island.bodies):
+                continue
+
+            if min(body.sleep_time for body in island.bodies) >= self.time_to_sleep:
+                for body in island.bodies:
+                    body.sleep(island.bodies)
+
+    # compact binary checkpoints, see snapshot.py. the broadphase and solver
+    # are not saved, pass them to load like to the constructor
+
+    def save(self, path : str):
+        settings = {
+            "gravity": self.gravity,
+            "allow_sleep": self.allow_sleep,
+            "sleep_linear": self.sleep_linear,
+            "sleep_angular": self.sleep_angular,
+            "time_to_sleep": self.time_to_sleep,
+        }
+
+        with open(path, "wb") as f:
+            snapshot.save(f, self.bodies, settings)
+
+    @classmethod
+    def load(cls, path : str, use_mmap : bool = False, **kwargs):
+        bodies, settings = snapshot.load(path, use_mmap)
+        settings.update(kwargs)
+
+        return cls(bodies=bodies, **settings)
+
+    # spatial queries, answered by the broadphase and then tested exactly
+
+    def candidates(self, box : AABB):
+        self.sort_bodies()
+        return self.broadphase.query(box, self.dynamic) + self.static.query(box)
+
+    def query_aabb(self, box : AABB):
+        return [body for body in self.candidates(box) if body.AABB.collide(box)]
+
+    def query_point(self, point : Vector):
+        box = AABB(point.x, point.y, point.x, point.y)
+        return [body for body in self.candidates(box) if body.contains(point)]
+
+    def raycast_all(self, origin : Vector, direction : Vector, max_dist : float = INF):
+        direction = direction.normalized()
+        hits = []
+
+        self.sort_bodies()
+        candidates = self.broadphase.query_ray(origin, direction, max_dist, self.dynamic)
+        candidates += self.static.query_ray(origin, direction, max_dist)
+
+        for body in candidates:
+            hit = body.raycast(origin, direction, max_dist)
+
+            if hit is not None:
+                dist, norm = hit
+                hits.append(RayHit(body, origin + direction * dist, norm, dist))
+
+        hits.sort(key=lambda hit: hit.dist)
+        return hits
+
+    def raycast(self, origin : Vector, direction : Vector, max_dist : float = INF):
+        hits = self.raycast_all(origin, direction, max_dist)
+        return hits[0] if hits else None
 
     def interact(self, left_click : bool, pos : Vector):
-        if left_click:
+        # clicking on a body does not spawn another one inside it
+        if left_click and not self.query_point(pos):
             if random.randint(0,1):
                 rad = random.uniform(0.5,5)
                 n = random.randint(3,10)
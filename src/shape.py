@@ -0,0 +1,89 @@
+from .linear_algebra import Vector
+from weakref import WeakValueDictionary
+from math import pi
+
+# geometry and unit density mass properties, shared by every body made from
+# the same vertices or radius. shapes are never modified after creation, so
+# bodies hold references to their tuples instead of copies. the registries
+# hand out an existing shape when one with the same key is still alive
+
+class PolygonShape:
+    __slots__ = ("points", "normals", "directions", "num_points", "winding", "area", "inertia", "extents", "__weakref__")
+
+    def __init__(self, points : list[Vector]):
+        num_points = len(points)
+
+        area = 0
+        centroid = Vector(0,0)
+        inertia = 0
+
+        for i in range(num_points):
+            p1 = points[i]
+            p2 = points[(i+1)%num_points]
+
+            cross = p1 ^ p2
+            area += cross
+            centroid += cross * (p1 + p2)
+            inertia += cross * (p1 * p1 + p1 * p2 + p2 * p2)
+
+        area /= 2
+        centroid /= 6 * area
+
+        # 1 for counter clockwise points, -1 for clockwise
+        self.winding = 1 if area > 0 else -1
+
+        area = abs(area)
+
+        points = tuple(point - centroid for point in points)
+
+        for i in range(num_points):
+            p1 = points[i]
+            p2 = points[(i+1)%num_points]
+
+            cross = p1 ^ p2
+            inertia += cross * (p1 * p1 + p1 * p2 + p2 * p2)
+
+        inertia /= 12
+
+        self.num_points = num_points
+        self.points = points
+        self.area = area
+        self.inertia = abs(inertia)
+
+        # local space edge normals, rotated into world space when used as SAT axes,
+        # and edge directions, rotated into world space as edges
+        self.normals = tuple((points[(i+1)%num_points] - points[i]).normalized().perpendicular() for i in range(num_points))
+        self.directions = tuple(Vector(normal.y, -normal.x) for normal in self.normals)
+
+        # local AABB, which is also the rotated one at ang == 0
+        self.extents = (min(p.x for p in points), min(p.y for p in points), max(p.x for p in points), max(p.y for p in points))
+
+class CircleShape:
+    __slots__ = ("rad", "area", "inertia", "__weakref__")
+
+    def __init__(self, rad : float):
+        self.rad = rad
+        self.area = rad ** 2
+        self.inertia = pi * rad ** 4 / 4
+
+POLYGON_SHAPES : WeakValueDictionary[tuple, PolygonShape] = WeakValueDictionary()
+CIRCLE_SHAPES : WeakValueDictionary[float, CircleShape] = WeakValueDictionary()
+
+def polygon_shape(points : list[Vector]):
+    key = tuple((p.x, p.y) for p in points)
+    shape = POLYGON_SHAPES.get(key)
+
+    if shape is None:
+        shape = PolygonShape(points)
+        POLYGON_SHAPES[key] = shape
+
+    return shape
+
+def circle_shape(rad : float):
+    shape = CIRCLE_SHAPES.get(rad)
+
+    if shape is None:
+        shape = CircleShape(rad)
+        CIRCLE_SHAPES[rad] = shape
+
+    return shape
@@ -0,0 +1,158 @@
+from .linear_algebra import Vector
+from .body import *
+from .plane import Plane
+from .circle import Circle
+from .polygon import Polygon
+from array import array
+from struct import Struct
+import mmap
+import sys
+
+# binary scene snapshots. everything is little endian:
+#
+#   header   magic, version, body count, shape value count, scene settings
+#   kinds    one byte per body
+#   state    STATE_SIZE doubles per body, see STATE
+#   offsets  body count + 1 uint32, where each body's values start in shapes
+#   shapes   doubles: plane normal x, y / circle radius / polygon local points
+#
+# bodies are rebuilt through their constructors for the shape data and then
+# have their state overwritten, so masses and velocities come back exactly.
+# with use_mmap the file is mapped instead of read into memory up front
+
+MAGIC = b"IMP2"
+VERSION = 1
+
+HEADER = Struct("<4sIIIdd?ddd7x") # padded to 64 bytes so the arrays are aligned
+STATE = ("pos.x", "pos.y", "ang", "vel.x", "vel.y", "ang_vel", "inv_mass", "inv_inertia", "e", "mu_s", "mu_d", "sleeping", "sleep_time")
+STATE_SIZE = len(STATE)
+
+def to_little_endian(values : array):
+    if sys.byteorder != "little":
+        values = array(values.typecode, values)
+        values.byteswap()
+
+    return values
+
+def from_little_endian(values):
+    if sys.byteorder != "little":
+        values = array(values.format, values)
+        values.byteswap()
+
+    return values
+
+def save(f, bodies : list[Body], settings : dict):
+    kinds = array("b")
+    state = array("d")
+    offsets = array("I", [0])
+    shapes = array("d")
+
+    for body in bodies:
+        kinds.append(body.kind)
+        state.extend((body.pos.x, body.pos.y, body.ang, body.vel.x, body.vel.y, body.ang_vel,
+                      body.inv_mass, body.inv_inertia, body.e, body.mu_s, body.mu_d,
+                      body.sleeping, body.sleep_time))
+
+        if body.kind == PLANE:
+            shapes.extend((body.norm.x, body.norm.y))
+        elif body.kind == CIRCLE:
+            shapes.append(body.rad)
+        else:
+            for point in body.points:
+                shapes.extend((point.x, point.y))
+
+        offsets.append(len(shapes))
+
+    gravity = settings["gravity"]
+
+    f.write(HEADER.pack(MAGIC, VERSION, len(bodies), len(shapes), gravity.x, gravity.y,
+                        settings["allow_sleep"], settings["sleep_linear"], settings["sleep_angular"], settings["time_to_sleep"]))
+
+    for values in (kinds, state, offsets, shapes):
+        f.write(to_little_endian(values).tobytes())
+
+def load(path : str, use_mmap : bool = False):
+    with open(path, "rb") as f:
+        if use_mmap:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            buffer = f.read()
+
+    view = memoryview(buffer)
+
+    try:
+        return unpack(view)
+    finally:
+        view.release()
+
+        if use_mmap:
+            buffer.close()
+
+def unpack(view : memoryview):
+    magic, version, num_bodies, num_shapes, gx, gy, allow_sleep, sleep_linear, sleep_angular, time_to_sleep = HEADER.unpack_from(view)
+
+    if magic != MAGIC:
+        raise ValueError("not a scene snapshot")
+    if version != VERSION:
+        raise ValueError(f"unsupported snapshot version {version}")
+
+    offset = HEADER.size
+    views = []
+
+    # the sections are read in place, only the values of each body are copied
+    # out as it is built. with use_mmap the pages are loaded as they are read
+    def section(typecode, count, itemsize):
+        nonlocal offset
+        start = offset
+        offset += count * itemsize
+        values = from_little_endian(view[start:offset].cast(typecode))
+
+        if isinstance(values, memoryview):
+            views.append(values)
+
+        return values
+
+    kinds = section("b", num_bodies, 1)
+    state = section("d", num_bodies * STATE_SIZE, 8)
+    offsets = section("I", num_bodies + 1, 4)
+    shapes = section("d", num_shapes, 8)
+
+    bodies : list[Body] = []
+
+    try:
+        for i in range(num_bodies):
+            kind = kinds[i]
+            s = i * STATE_SIZE
+            start = offsets[i]
+            pos = Vector(state[s], state[s+1])
+            vel = Vector(state[s+3], state[s+4])
+
+            if kind == PLANE:
+                body = Plane(pos, Vector(shapes[start], shapes[start+1]), state[s+8], state[s+9], state[s+10])
+            elif kind == CIRCLE:
+                body = Circle(pos, shapes[start], state[s+2], 1, vel, state[s+5], state[s+8], state[s+9], state[s+10])
+            elif kind == POLYGON:
+                points = [Vector(shapes[j], shapes[j+1]) for j in range(start, offsets[i+1], 2)]
+                body = Polygon(pos, points, state[s+2], 1, vel, state[s+5], state[s+8], state[s+9], state[s+10])
+            else:
+                raise ValueError(f"unknown body kind {kind}")
+
+            body.inv_mass = state[s+6]
+            body.inv_inertia = state[s+7]
+            body.sleeping = bool(state[s+11])
+            body.sleep_time = state[s+12]
+
+            bodies.append(body)
+    finally:
+        for values in views:
+            values.release()
+
+    settings = {
+        "gravity": Vector(gx, gy),
+        "allow_sleep": allow_sleep,
+        "sleep_linear": sleep_linear,
+        "sleep_angular": sleep_angular,
+        "time_to_sleep": time_to_sleep,
+    }
+
+    return bodies, settings
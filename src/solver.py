@@ -0,0 +1,150 @@
+from concurrent.futures import ThreadPoolExecutor
+from .linear_algebra import Vector
+from .collision import Collision
+from .island import build_islands
+
+class Solver:
+    iterations = 1
+
+    def solve(self, collisions : list[Collision], delta_time : float):
+        self.begin(delta_time)
+        self.solve_island(collisions)
+
+    def begin(self, delta_time : float):
+        pass
+
+    def solve_island(self, collisions : list[Collision]):
+        for collision in collisions:
+            collision.resolve()
+
+# runs a number of velocity iterations over all manifolds. contacts persist
+# across frames keyed by body pair and feature, and their accumulated normal
+# and tangent impulses warm start the next frame, which keeps stacks stable
+# at much larger timesteps than a single impulse pass.
+# what limits stack height is the timestep, not the iteration count: a stack
+# of ten 1m boxes stays up at 60Hz with the default 8 iterations but topples
+# within seconds at 30Hz with anything from 8 to 30, as the bodies rock off
+# one corner of their contacts. 15 or 20 boxes need 120Hz. step tall stacks
+# at 60Hz or faster, e.g. Stepper(scene, rate=30, substeps=2)
+
+class SequentialImpulseSolver(Solver):
+    def __init__(self, 
+                 iterations : int = 8, 
+                 warm_start : bool = True, 
+                 restitution_threshold : float = 1, 
+                 baumgarte : float = 0.2,
+                 slop : float = 0.01,
+                 match_distance : float = 0.05):
+        
+        self.iterations = iterations
+        self.warm_start = warm_start
+        self.restitution_threshold = restitution_threshold
+        self.baumgarte = baumgarte
+        self.slop = slop
+        self.match_distance = match_distance
+        self.delta_time = 0
+
+        # body pair -> [(feature, contact x, contact y, normal impulse, tangent impulse)].
+        # contact coordinates are copied out, the manifolds are pooled
+        self.impulses : dict[tuple, list[tuple]] = {}
+        self.last_impulses : dict[tuple, list[tuple]] = {}
+
+    def begin(self, delta_time : float):
+        self.delta_time = delta_time
+        self.last_impulses = self.impulses
+        self.impulses = {}
+
+    def lookup(self, cached : list[tuple], feature, contact : Vector):
+        nearest = None
+        min_dist = self.match_distance ** 2
+
+        for cached_feature, x, y, j, j_t in cached:
+            if cached_feature == feature:
+                return j, j_t
+
+            # features can change when the reference and incident shapes swap,
+            # so fall back to the closest old contact
+            dist = (x - contact.x) ** 2 + (y - contact.y) ** 2
+
+            if dist < min_dist:
+                min_dist = dist
+                nearest = (j, j_t)
+
+        return nearest or (0, 0)
+
+    def solve_island(self, collisions : list[Collision]):
+        last_impulses = self.last_impulses
+
+        # restitution is measured before any warm start impulses are applied
+        for collision in collisions:
+            collision.prepare(self.delta_time, self.restitution_threshold, self.baumgarte, self.slop)
+
+        for collision in collisions:
+            if not self.warm_start:
+                break
+
+            cached = last_impulses.get((collision.A, collision.B))
+
+            if cached is None:
+                continue
+
+            normal_impulses = []
+            tangent_impulses = []
+
+            for feature, contact in zip(collision.features, collision.contacts):
+                j, j_t = self.lookup(cached, feature, contact)
+                normal_impulses.append(j)
+                tangent_impulses.append(j_t)
+
+            collision.warm_start(normal_impulses, tangent_impulses)
+
+        for _ in range(self.iterations):
+            for collision in collisions:
+                collision.solve_velocity()
+
+        impulses = self.impulses
+
+        for collision in collisions:
+            impulses[(collision.A, collision.B)] = [(feature, contact.x, contact.y, j, j_t)
+                                                    for feature, contact, j, j_t in zip(collision.features,
+                                                                                        collision.contacts,
+                                                                                        collision.normal_impulses,
+                                                                                        collision.tangent_impulses)]
+
+# solves independent islands concurrently. islands share no dynamic bodies and
+# each is solved in its original contact order, so the result is the same as
+# solving serially. threads only run in parallel on free-threaded CPython
+
+class ParallelSolver(Solver):
+    def __init__(self, solver : Solver = None, workers : int = None, min_island_size : int = 64):
+        self.solver = solver or Solver()
+        self.pool = ThreadPoolExecutor(workers)
+        self.min_island_size = min_island_size
+
+    @property
+    def iterations(self):
+        return self.solver.iterations
+
+    def solve(self, collisions : list[Collision], delta_time : float):
+        self.solver.begin(delta_time)
+        bodies = {}
+
+        for collision in collisions:
+            if collision.A.inv_mass != 0:
+                bodies[collision.A] = None
+            if collision.B.inv_mass != 0:
+                bodies[collision.B] = None
+
+        large = []
+
+        for island in build_islands(list(bodies), collisions):
+            if len(island.collisions) < self.min_island_size:
+                self.solver.solve_island(island.collisions)
+            else:
+                large.append(island.collisions)
+
+        for _ in self.pool.map(self.solver.solve_island, large):
+            pass
+
+    def shutdown(self):
+        self.pool.shutdown()
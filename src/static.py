@@ -0,0 +1,80 @@
+from .linear_algebra import Vector
+from .body import *
+from .AABB import AABB, INF
+from .tree import AABBTree, Node
+
+# bodies with inv_mass == 0 never move, so they are kept out of the
+# broadphase: bounded ones go in an AABB tree built as they are added and
+# planes are kept as half-spaces. static bodies are never paired with each
+# other and only awake dynamic bodies are tested against them.
+# pairs come out as (static, dynamic)
+
+class StaticGeometry:
+    def __init__(self):
+        self.tree = AABBTree()
+        self.planes : list[Body] = []
+        self.bodies : list[Body] = []
+        self.leaves : dict[Body, Node] = {}
+
+    def add(self, body : Body):
+        self.bodies.append(body)
+
+        if body.kind == PLANE:
+            self.planes.append(body)
+        else:
+            box = body.AABB
+            self.leaves[body] = self.tree.insert(AABB(box.x1, box.y1, box.x2, box.y2), body)
+
+    def remove(self, body : Body):
+        self.bodies.remove(body)
+
+        if body.kind == PLANE:
+            self.planes.remove(body)
+        else:
+            self.tree.remove(self.leaves.pop(body))
+
+    def pairs(self, bodies : list[Body]):
+        res = []
+        tree = self.tree
+        awake = [body for body in bodies if not body.sleeping]
+
+        if tree.root is not None:
+            for body in awake:
+                for other in tree.query(body.AABB):
+                    res.append((other, body))
+
+        # half-space pass: only bodies whose AABB reaches behind the plane.
+        # each box is read once and tested against every plane at its corner
+        # furthest along -normal. the pairs are collected per plane so they
+        # come out plane by plane as before
+        tests = []
+
+        for plane in self.planes:
+            nx = plane.norm.x
+            ny = plane.norm.y
+            tests.append((plane, nx, ny, plane.pos.x * nx + plane.pos.y * ny, nx > 0, ny > 0, []))
+
+        if not tests:
+            return res
+
+        for body in awake:
+            box = body.AABB
+            x1 = box.x1
+            y1 = box.y1
+            x2 = box.x2
+            y2 = box.y2
+
+            for plane, nx, ny, offset, left, bottom, behind in tests:
+                if (x1 if left else x2) * nx + (y1 if bottom else y2) * ny < offset:
+                    behind.append((plane, body))
+
+        for test in tests:
+            res += test[-1]
+
+        return res
+
+    def query(self, box : AABB):
+        return self.tree.query(box) + self.planes
+
+    def query_ray(self, origin : Vector, direction : Vector, max_dist : float = INF):
+        return self.tree.raycast(origin, direction, max_dist) + self.planes
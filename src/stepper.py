@@ -0,0 +1,75 @@
+from .linear_algebra import Vector
+from .body import Body
+from .scene import Scene
+
+# fixed timestep driver around Scene.update. frame time is banked in an
+# accumulator and spent in whole physics steps of 1/rate seconds, each split
+# into substeps. at most max_steps are taken per frame so a slow frame cannot
+# snowball into ever slower ones, the time beyond that is dropped.
+# alpha is how far the leftover time reaches into the next step, renderers
+# blend between the previous and current step with it via state()
+
+class Stepper:
+    def __init__(self, scene : Scene, rate : float = 60, substeps : int = 1, max_steps : int = 5):
+        self.scene = scene
+        self.rate = rate
+        self.substeps = substeps
+        self.max_steps = max_steps
+
+        self.accumulator = 0
+        self.alpha = 1
+        self.previous : dict[Body, tuple[float, float, float]] = {}
+
+    @property
+    def step_time(self):
+        return 1 / self.rate
+
+    def advance(self, frame_time : float):
+        if self.scene.paused:
+            self.accumulator = 0
+            self.alpha = 1
+            return
+
+        step_time = self.step_time
+        self.accumulator += frame_time
+
+        collisions = None
+        num_steps = 0
+
+        while self.accumulator >= step_time and num_steps < self.max_steps:
+            collisions = self.step()
+            self.accumulator -= step_time
+            num_steps += 1
+
+        if self.accumulator >= step_time:
+            self.accumulator %= step_time
+
+        self.alpha = self.accumulator / step_time
+
+        return collisions
+
+    def step(self):
+        self.previous = {body: (body.pos.x, body.pos.y, body.ang) for body in self.scene.bodies}
+
+        delta_time = self.step_time / self.substeps
+
+        for _ in range(self.substeps):
+            collisions = self.scene.update(delta_time)
+
+        self.alpha = 1
+        return collisions
+
+    # body position and angle blended between the last two steps
+
+    def state(self, body : Body):
+        pos = body.pos
+        prev = self.previous.get(body)
+
+        if prev is None or self.alpha == 1:
+            return Vector(pos.x, pos.y), body.ang
+
+        alpha = self.alpha
+        beta = 1 - alpha
+        x, y, ang = prev
+
+        return Vector(x * beta + pos.x * alpha, y * beta + pos.y * alpha), ang * beta + body.ang * alpha
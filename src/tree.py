@@ -0,0 +1,230 @@
+from .AABB import AABB, INF
+from .linear_algebra import Vector
+
+class Node:
+    def __init__(self, box : AABB, body=None):
+        self.AABB = box
+        self.body = body
+
+        self.parent : Node = None
+        self.left : Node = None
+        self.right : Node = None
+        self.height = 0
+
+    def is_leaf(self):
+        return self.left is None
+
+# dynamic bounding volume hierarchy. leaves hold fattened AABBs so that a body
+# only has to be reinserted once its tight AABB leaves its fat one
+
+class AABBTree:
+    def __init__(self):
+        self.root : Node = None
+
+    def insert(self, box : AABB, body=None):
+        leaf = Node(box, body)
+        self.insert_leaf(leaf)
+        return leaf
+
+    def remove(self, leaf : Node):
+        self.remove_leaf(leaf)
+
+    def move(self, leaf : Node, box : AABB):
+        self.remove_leaf(leaf)
+        leaf.AABB = box
+        self.insert_leaf(leaf)
+
+    def insert_leaf(self, leaf : Node):
+        if self.root is None:
+            self.root = leaf
+            leaf.parent = None
+            return
+
+        # find the cheapest sibling by the surface area heuristic
+        box = leaf.AABB
+        sibling = self.root
+
+        while not sibling.is_leaf():
+            left = sibling.left
+            right = sibling.right
+
+            area = sibling.AABB.perimeter()
+            combined_area = sibling.AABB.union(box).perimeter()
+
+            cost = 2 * combined_area
+            inheritance_cost = 2 * (combined_area - area)
+
+            cost_left = box.union(left.AABB).perimeter() + inheritance_cost
+            if not left.is_leaf():
+                cost_left -= left.AABB.perimeter()
+
+            cost_right = box.union(right.AABB).perimeter() + inheritance_cost
+            if not right.is_leaf():
+                cost_right -= right.AABB.perimeter()
+
+            if cost < cost_left and cost < cost_right:
+                break
+
+            sibling = left if cost_left < cost_right else right
+
+        old_parent = sibling.parent
+        new_parent = Node(sibling.AABB.union(box))
+        new_parent.parent = old_parent
+        new_parent.height = sibling.height + 1
+
+        if old_parent is None:
+            self.root = new_parent
+        elif old_parent.left is sibling:
+            old_parent.left = new_parent
+        else:
+            old_parent.right = new_parent
+
+        new_parent.left = sibling
+        new_parent.right = leaf
+        sibling.parent = new_parent
+        leaf.parent = new_parent
+
+        self.refit(new_parent)
+
+    def remove_leaf(self, leaf : Node):
+        if leaf is self.root:
+            self.root = None
+            return
+
+        parent = leaf.parent
+        grand_parent = parent.parent
+        sibling = parent.right if parent.left is leaf else parent.left
+
+        if grand_parent is None:
+            self.root = sibling
+            sibling.parent = None
+        else:
+            if grand_parent.left is parent:
+                grand_parent.left = sibling
+            else:
+                grand_parent.right = sibling
+
+            sibling.parent = grand_parent
+            self.refit(grand_parent)
+
+        leaf.parent = None
+
+    def refit(self, node : Node):
+        while node is not None:
+            node = self.balance(node)
+
+            left = node.left
+            right = node.right
+
+            node.height = 1 + max(left.height, right.height)
+            node.AABB = left.AABB.union(right.AABB)
+
+            node = node.parent
+
+    def balance(self, A : Node):
+        if A.is_leaf() or A.height < 2:
+            return A
+
+        B = A.left
+        C = A.right
+        balance = C.height - B.height
+
+        if balance > 1:
+            return self.rotate(A, C, B, right=True)
+
+        if balance < -1:
+            return self.rotate(A, B, C, right=False)
+
+        return A
+
+    # lift the taller child up to replace A, moving A down beneath it
+
+    def rotate(self, A : Node, up : Node, other : Node, right : bool):
+        F = up.left
+        G = up.right
+
+        up.left = A
+        up.parent = A.parent
+        A.parent = up
+
+        if up.parent is None:
+            self.root = up
+        elif up.parent.left is A:
+            up.parent.left = up
+        else:
+            up.parent.right = up
+
+        if F.height > G.height:
+            keep, give = F, G
+        else:
+            keep, give = G, F
+
+        up.right = keep
+
+        if right:
+            A.right = give
+        else:
+            A.left = give
+
+        give.parent = A
+
+        A.AABB = other.AABB.union(give.AABB)
+        up.AABB = A.AABB.union(keep.AABB)
+
+        A.height = 1 + max(other.height, give.height)
+        up.height = 1 + max(A.height, keep.height)
+
+        return up
+
+    def query(self, box : AABB):
+        res = []
+
+        if self.root is None:
+            return res
+
+        # AABB.collide inlined, this is the inner loop of every tree query
+        x1 = box.x1
+        y1 = box.y1
+        x2 = box.x2
+        y2 = box.y2
+
+        stack = [self.root]
+        pop = stack.pop
+        push = stack.append
+
+        while stack:
+            node = pop()
+            node_box = node.AABB
+
+            if node_box.x1 >= x2 or node_box.x2 <= x1 or node_box.y1 >= y2 or node_box.y2 <= y1:
+                continue
+
+            if node.left is None:
+                res.append(node.body)
+            else:
+                push(node.left)
+                push(node.right)
+
+        return res
+
+    def raycast(self, origin : Vector, direction : Vector, max_dist : float = INF):
+        res = []
+
+        if self.root is None:
+            return res
+
+        stack = [self.root]
+
+        while stack:
+            node = stack.pop()
+
+            if node.AABB.raycast(origin, direction, max_dist) is None:
+                continue
+
+            if node.is_leaf():
+                res.append(node.body)
+            else:
+                stack.append(node.left)
+                stack.append(node.right)
+
+        return res